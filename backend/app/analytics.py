@@ -0,0 +1,98 @@
+"""
+Shared aggregation engine for the analytics and stats endpoints.
+
+Inflow, outflow, transaction count and uncategorized count are computed
+together with SUM(CASE ...) in a single pass: over monthly_rollups for whole
+months and over transactions only for the partial months at the edges of a
+date range (see app.rollups).
+"""
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, case, func, select
+
+from . import models
+from .rollups import split_date_range, _transaction_expressions
+
+# Columns results can be grouped by
+GROUP_KEYS = ("month", "account_id", "category_id")
+
+class AnalyticsFilters:
+    """Filters shared by all analytics endpoints; usable as `Depends()`."""
+
+    def __init__(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 account_id: Optional[int] = None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.account_id = account_id
+
+class Totals(NamedTuple):
+    inflow: float = 0.0         # Sum of positive amounts, transfers excluded
+    outflow: float = 0.0        # Sum of negative amounts (negative), transfers excluded
+    count: int = 0              # All transactions, transfers included
+    uncategorized: int = 0      # Non-transfer transactions without a category
+
+def _rollup_query(keys: Sequence[str], filters: AnalyticsFilters, months):
+    r = models.MonthlyRollup
+    spending = r.is_transfer == 0
+    query = select(
+        *(getattr(r, k) for k in keys),
+        func.sum(case((and_(spending, r.sign > 0), r.total), else_=0.0)),
+        func.sum(case((and_(spending, r.sign < 0), r.total), else_=0.0)),
+        func.sum(r.count),
+        func.sum(case((and_(spending, r.category_id.is_(None)), r.count), else_=0)),
+    )
+    if months[0]:
+        query = query.where(r.month >= months[0])
+    if months[1]:
+        query = query.where(r.month <= months[1])
+    if filters.account_id is not None:
+        query = query.where(r.account_id == filters.account_id)
+    return query.group_by(*(getattr(r, k) for k in keys))
+
+def _transaction_query(keys: Sequence[str], filters: AnalyticsFilters, start, end):
+    t = models.Transaction
+    tx_expr = _transaction_expressions()
+    # NULL is_transfer counts as spending, as in the rollup
+    spending = tx_expr["is_transfer"] == 0
+    query = select(
+        *(tx_expr[k] for k in keys),
+        func.sum(case((and_(spending, t.amount > 0), t.amount), else_=0.0)),
+        func.sum(case((and_(spending, t.amount < 0), t.amount), else_=0.0)),
+        func.count(),
+        func.sum(case((and_(spending, t.category_id.is_(None)), 1), else_=0)),
+    )
+    if start:
+        query = query.where(t.date >= start)
+    if end:
+        query = query.where(t.date <= end)
+    if filters.account_id is not None:
+        query = query.where(t.account_id == filters.account_id)
+    return query.group_by(*(tx_expr[k] for k in keys))
+
+def aggregate(db, keys: Sequence[str], filters: Optional[AnalyticsFilters] = None) -> Dict[tuple, Totals]:
+    """
+    Computes `Totals` grouped by `keys` (a subset of GROUP_KEYS) for the
+    transactions matching `filters`. Returns {key tuple: Totals}; use
+    `keys=()` for a single overall total under the key ().
+    """
+    filters = filters or AnalyticsFilters()
+    split = split_date_range(filters.start_date, filters.end_date)
+    if split is None:
+        # Not an ISO date range: compare the raw bounds against transactions, as before
+        months, edges = None, [(filters.start_date, filters.end_date)]
+    else:
+        months, edges = split
+
+    queries = [_transaction_query(keys, filters, start, end) for start, end in edges]
+    if months is not None:
+        queries.append(_rollup_query(keys, filters, months))
+
+    result: Dict[tuple, Totals] = {}
+    for query in queries:
+        for row in db.execute(query):
+            key = tuple(row[:len(keys)])
+            inflow, outflow, count, uncategorized = row[len(keys):]
+            prev = result.get(key, Totals())
+            result[key] = Totals(prev.inflow + (inflow or 0.0), prev.outflow + (outflow or 0.0),
+                                 prev.count + (count or 0), prev.uncategorized + (uncategorized or 0))
+    return result
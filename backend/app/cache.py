@@ -0,0 +1,120 @@
+"""
+In-process response cache for read-heavy endpoints (analytics, accounts, categories).
+
+Every database has a data version, stored in its data_version table and
+bumped in the same transaction as every write (ORM flush or
+INSERT/UPDATE/DELETE construct). That covers imports, edits, deletes, rule
+changes and background re-categorizations alike, made by this worker or any
+other. Cached responses are keyed on database, path and query parameters,
+are only served while their data version is current and are evicted LRU by
+count and size. The version doubles as the ETag, so clients can revalidate
+with If-None-Match and get a 304.
+"""
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from . import models
+
+MAX_ENTRIES = 256
+MAX_BYTES = 16 * 1024 * 1024
+
+# Keeps ETags from a previous server run from matching after a restart
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+_BUMP_DATA_VERSION = text(
+    "INSERT INTO data_version (id, version) VALUES (1, 1) "
+    "ON CONFLICT (id) DO UPDATE SET version = version + 1"
+)
+
+def database_key(db: Session) -> str:
+    return str(db.get_bind().url)
+
+def data_version(db: Session) -> int:
+    """The version of the data stored in `db`; changes with every committed write."""
+    return db.execute(select(models.DataVersion.version).where(models.DataVersion.id == 1)).scalar() or 0
+
+# Bumped on the session's connection, so it commits or rolls back with the write
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    session.connection().execute(_BUMP_DATA_VERSION)
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_statement(orm_execute_state):
+    # Only DML constructs; reads, including text() ones, must not write
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.connection().execute(_BUMP_DATA_VERSION)
+
+class ResponseCache:
+    """LRU cache of serialized JSON responses, bounded by entry count and total size."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[int, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _get(self, key: Tuple, version: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key: Tuple, version: int, body: bytes):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = (version, body)
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def respond(self, request: Request, db: Session, compute: Callable[[], Any]) -> Response:
+        """
+        Returns the cached JSON response for this request if the database has
+        not changed since it was computed, a 304 if the client already has it,
+        and otherwise calls `compute` and caches its result.
+        """
+        db_key = database_key(db)
+        # Read before computing: a write that commits meanwhile makes the entry stale
+        version = data_version(db)
+        digest = hashlib.sha1(db_key.encode()).hexdigest()[:8]
+        etag = f'"{_BOOT_ID}-{digest}-{version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        key = (db_key, request.url.path, tuple(sorted(request.query_params.multi_items())))
+        body = self._get(key, version)
+        if body is None:
+            body = json.dumps(jsonable_encoder(compute()), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._put(key, version, body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+# Process-wide cache used by the API
+response_cache = ResponseCache()
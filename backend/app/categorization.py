@@ -1,28 +1,77 @@
+from sqlalchemy import or_, select, bindparam, false, true, func, event, text
 from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from . import models
+from .rollups import RollupDelta
 from .services.categorizer import TransactionCategorizer
+from .services.matcher import fold, required_literal
+import logging
 import re
 import os
 
-# Singleton instance for high performance
-_categorizer = None
+logger = logging.getLogger(__name__)
+
+# One compiled categorizer per database (keyed by its URL), together with the
+# rules version it was built from; rebuilt on first use after the version changed
+_categorizers: Dict[Optional[str], Tuple[int, TransactionCategorizer]] = {}
+
+_RULE_TABLES = {models.CategorizationRule.__tablename__, models.Label.__tablename__}
+
+_BUMP_RULES_VERSION = text(
+    "INSERT INTO rules_version (id, version) VALUES (1, 1) "
+    "ON CONFLICT (id) DO UPDATE SET version = version + 1"
+)
+
+def _database_key(db: Optional[Session]) -> Optional[str]:
+    return str(db.get_bind().url) if db is not None else None
+
+def rules_version(db: Session) -> int:
+    """
+    The version of the rules and labels stored in `db`, bumped in the same
+    transaction as every change to them. Workers compare it before
+    categorizing, so a rule change made by one process reaches all of them.
+    """
+    return db.execute(select(models.RulesVersion.version).where(models.RulesVersion.id == 1)).scalar() or 0
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_rule_flush(session, flush_context, instances):
+    def is_rule(obj):
+        return isinstance(obj, (models.CategorizationRule, models.Label))
+    # Label collections change with every labelled transaction; only column changes count
+    if (any(is_rule(obj) for obj in (*session.new, *session.deleted))
+            or any(is_rule(obj) and session.is_modified(obj, include_collections=False) for obj in session.dirty)):
+        session.connection().execute(_BUMP_RULES_VERSION)
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_rule_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if getattr(table, "name", None) in _RULE_TABLES:
+            orm_execute_state.session.connection().execute(_BUMP_RULES_VERSION)
 
 def sync_rules(db: Session):
     """
-    Reloads all rules from the database into the singleton categorizer instance.
+    Reloads all rules from the database into its categorizer instance.
     Returns a list of patterns that failed to load.
     """
-    global _categorizer
-    _categorizer = None
+    _categorizers.pop(_database_key(db), None)
     categorizer = get_categorizer(db)
     return getattr(categorizer, "_failed_rules", [])
 
 def get_categorizer(db: Session = None):
-    global _categorizer
-    if _categorizer is None:
-        print("DEBUG: Initializing Waterfall Categorizer...")
-        _categorizer = TransactionCategorizer()
-        _categorizer._failed_rules = []
+    """
+    Returns the categorizer for `db`'s database, rebuilding it only when the
+    rules or labels changed since it was compiled.
+    """
+    key = _database_key(db)
+    version = rules_version(db) if db is not None else 0
+    cached = _categorizers.get(key)
+    categorizer = cached[1] if cached is not None and cached[0] == version else None
+    if categorizer is None:
+        logger.debug("Initializing Waterfall Categorizer...")
+        categorizer = TransactionCategorizer()
+        categorizer._failed_rules = []
+        categorizer.labels = {}
         if db:
             rules = db.query(models.CategorizationRule).order_by(models.CategorizationRule.priority.asc()).all()
             for rule in rules:
@@ -36,76 +85,343 @@ def get_categorizer(db: Session = None):
                     elif rule.target_category_id:
                         target_name = f"__ID_CAT__:{rule.target_category_id}"
                     
-                    _categorizer.add_regex_pattern(rule.pattern, target_name)
+                    categorizer.add_regex_pattern(rule.pattern, target_name, rule_id=rule.id)
                 except Exception as e:
-                    _categorizer._failed_rules.append({"pattern": rule.pattern, "error": str(e)})
-    return _categorizer
+                    logger.warning("Skipping rule %s with invalid pattern %r: %s", rule.id, rule.pattern, e)
+                    categorizer._failed_rules.append({"pattern": rule.pattern, "error": str(e)})
 
-def categorize_transaction(db: Session, transaction: models.Transaction, force: bool = False):
-    if transaction.is_manual and not force:
-        return False
-    
-    categorizer = get_categorizer(db)
-    result = categorizer.categorize(transaction.description)
-    
-    cat_str = result["category"]
-    
+            # Label id -> name cache, refreshed together with the rules
+            categorizer.labels = dict(db.query(models.Label.id, models.Label.name).all())
+            logger.info("Loaded %d categorization rules (%d failed)", len(rules) - len(categorizer._failed_rules), len(categorizer._failed_rules))
+        _categorizers[key] = (version, categorizer)
+    return categorizer
+
+def category_state(state: Tuple, cat_str: str, rule_id: Optional[int] = None) -> Tuple:
+    """
+    Maps a categorizer result onto a (category_id, is_transfer, to_account_id,
+    matched_rule_id) state. Results that are neither rule targets nor
+    "Uncategorized" (e.g. ML class names) leave the state untouched.
+    """
     if cat_str != "Uncategorized":
         if cat_str.startswith("__ID_TRANSFER__:"):
             acc_id = int(cat_str.replace("__ID_TRANSFER__:", ""))
-            transaction.is_transfer = 1
-            transaction.to_account_id = acc_id
-            transaction.category_id = None
+            return (None, 1, acc_id, rule_id)
         elif cat_str.startswith("__ID_CAT__:"):
             cat_id = int(cat_str.replace("__ID_CAT__:", ""))
-            transaction.category_id = cat_id
-            transaction.is_transfer = 0
-            transaction.to_account_id = None
-    else:
-        # Revert to Uncategorized if no rules match
-        transaction.category_id = None
-        transaction.is_transfer = 0
-        transaction.to_account_id = None
-    
-    # Layer 2: Labeling
-    labels_matched = categorizer.get_labels(transaction.description)
-    if labels_matched:
-        for lbl_id_str in labels_matched:
-            lbl_id = int(lbl_id_str)
-            lbl = db.query(models.Label).filter(models.Label.id == lbl_id).first()
-            if lbl and lbl not in transaction.labels:
-                transaction.labels.append(lbl)
-
-    return (cat_str != "Uncategorized") or (len(labels_matched) > 0)
-
-def recategorize_all(db: Session):
+            return (cat_id, 0, None, rule_id)
+        return state
+    # Revert to Uncategorized if no rules match
+    return (None, 0, None, None)
+
+def sync_labels(db: Session, assignments: Dict[int, Dict[int, Optional[int]]], chunk_size: int = 500) -> Set[int]:
+    """
+    Brings rule-assigned labels in line with `assignments`
+    ({transaction_id: {label_id: rule_id}}) using a set diff against
+    `transaction_labels` and bulk inserts/updates/deletes.
+
+    Only label rows carrying rule provenance are removed when no rule assigns
+    them anymore; rows without provenance are left alone.
+    Returns the ids of transactions whose label set changed.
+    """
+    tl = models.transaction_labels
+    known_labels = get_categorizer(db).labels
+    changed: Set[int] = set()
+    ids = list(assignments)
+
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        current: Dict[int, Dict[int, Optional[int]]] = {tx_id: {} for tx_id in chunk}
+        for tx_id, lbl_id, rule_id in db.execute(
+            select(tl.c.transaction_id, tl.c.label_id, tl.c.rule_id).where(tl.c.transaction_id.in_(chunk))
+        ):
+            current[tx_id][lbl_id] = rule_id
+
+        inserts, updates, deletes = [], [], []
+        for tx_id in chunk:
+            desired = {lbl_id: rule_id for lbl_id, rule_id in assignments[tx_id].items() if lbl_id in known_labels}
+            existing = current[tx_id]
+            for lbl_id, rule_id in desired.items():
+                if lbl_id not in existing:
+                    inserts.append({"transaction_id": tx_id, "label_id": lbl_id, "rule_id": rule_id})
+                    changed.add(tx_id)
+                elif existing[lbl_id] != rule_id:
+                    updates.append({"tx_id": tx_id, "lbl_id": lbl_id, "new_rule_id": rule_id})
+            for lbl_id, rule_id in existing.items():
+                if rule_id is not None and lbl_id not in desired:
+                    deletes.append({"tx_id": tx_id, "lbl_id": lbl_id})
+                    changed.add(tx_id)
+
+        if inserts:
+            db.execute(tl.insert(), inserts)
+        if updates:
+            db.execute(
+                tl.update().where(tl.c.transaction_id == bindparam("tx_id"), tl.c.label_id == bindparam("lbl_id"))
+                .values(rule_id=bindparam("new_rule_id")),
+                updates
+            )
+        if deletes:
+            db.execute(
+                tl.delete().where(tl.c.transaction_id == bindparam("tx_id"), tl.c.label_id == bindparam("lbl_id")),
+                deletes
+            )
+    return changed
+
+def label_assignment(labels_matched: List[str], label_rule_ids: Optional[List[Optional[int]]]) -> Dict[int, Optional[int]]:
+    if label_rule_ids is None:
+        label_rule_ids = [None] * len(labels_matched)
+    return {int(lbl_id): rule_id for lbl_id, rule_id in zip(labels_matched, label_rule_ids)}
+
+def categorize_transaction(db: Session, transaction: models.Transaction, force: bool = False):
+    if transaction.is_manual and not force:
+        return False
+    return categorize_transactions(db, [transaction], force=force)[0]
+
+def categorize_transactions(db: Session, transactions: List[models.Transaction], force: bool = False) -> List[bool]:
+    """
+    Batch version of `categorize_transaction`: all descriptions are run
+    through the categorizer in a single `categorize_many` call and label
+    changes are written in bulk. New transactions are flushed first, so
+    their label rows can reference them. Returns one "matched" flag per
+    transaction.
+    """
+    matched = [False] * len(transactions)
+    todo = [i for i, t in enumerate(transactions) if force or not t.is_manual]
+    if not todo:
+        return matched
+
+    categorizer = get_categorizer(db)
+    results = list(categorizer.categorize_many([transactions[i].description for i in todo]).itertuples(index=False))
+    for i, row in zip(todo, results):
+        t = transactions[i]
+        (t.category_id, t.is_transfer, t.to_account_id, t.matched_rule_id) = category_state(
+            (t.category_id, t.is_transfer, t.to_account_id, t.matched_rule_id), row.category, row.rule_id
+        )
+        matched[i] = (row.category != "Uncategorized") or (len(row.labels) > 0)
+    if any(transactions[i].id is None for i in todo):
+        db.flush()
+
+    assignments = {transactions[i].id: label_assignment(row.labels, row.label_rule_ids) for i, row in zip(todo, results)}
+
+    changed = sync_labels(db, assignments)
+    for t in transactions:
+        if t.id in changed:
+            db.expire(t, ["labels"])
+    return matched
+
+def rule_transactions_query(db: Session, rule_id: int):
+    """
+    Transactions whose category or one of whose labels was assigned by the
+    given rule, answered from the indexed provenance columns.
+    """
+    labelled = select(models.transaction_labels.c.transaction_id).where(models.transaction_labels.c.rule_id == rule_id)
+    return db.query(models.Transaction).filter(
+        or_(models.Transaction.matched_rule_id == rule_id, models.Transaction.id.in_(labelled))
+    )
+
+_NOT_MANUAL = or_(models.Transaction.is_manual == None, models.Transaction.is_manual == 0)
+
+# Only the columns re-categorization reads, so no ORM objects (or raw_data) are loaded
+_STATE_COLUMNS = (
+    models.Transaction.id,
+    models.Transaction.description,
+    models.Transaction.category_id,
+    models.Transaction.is_transfer,
+    models.Transaction.to_account_id,
+    models.Transaction.matched_rule_id,
+    # For the analytics rollup
+    models.Transaction.date,
+    models.Transaction.account_id,
+    models.Transaction.amount,
+)
+
+def _recategorize_rows(db: Session, rows) -> Tuple[int, int]:
+    """
+    Re-applies rules to a chunk of `_STATE_COLUMNS` rows and writes back only
+    the rows that changed with a single executemany UPDATE.
+    Returns (matches, changes).
+    """
+    results = get_categorizer(db).categorize_many([row.description for row in rows])
+
+    matches = 0
+    updates = []
+    changed_ids = set()
+    assignments = {}
+    delta = RollupDelta()
+    for row, result in zip(rows, results.itertuples(index=False)):
+        old_state = (row.category_id, row.is_transfer, row.to_account_id, row.matched_rule_id)
+        new_state = category_state(old_state, result.category, result.rule_id)
+        if new_state != old_state:
+            updates.append({
+                "tx_id": row.id,
+                "category_id": new_state[0],
+                "is_transfer": new_state[1],
+                "to_account_id": new_state[2],
+                "matched_rule_id": new_state[3],
+            })
+            # A provenance-only update is not a visible change
+            if new_state[:3] != old_state[:3]:
+                changed_ids.add(row.id)
+            if new_state[:2] != old_state[:2]:
+                delta.remove(row.date, row.account_id, row.category_id, row.is_transfer, row.amount)
+                delta.add(row.date, row.account_id, new_state[0], new_state[1], row.amount)
+        assignments[row.id] = label_assignment(result.labels, result.label_rule_ids)
+        if result.category != "Uncategorized" or len(result.labels) > 0:
+            matches += 1
+
+    if updates:
+        table = models.Transaction.__table__
+        db.execute(
+            table.update().where(table.c.id == bindparam("tx_id")).values(
+                category_id=bindparam("category_id"),
+                is_transfer=bindparam("is_transfer"),
+                to_account_id=bindparam("to_account_id"),
+                matched_rule_id=bindparam("matched_rule_id"),
+            ),
+            updates
+        )
+        delta.apply(db)
+    changed_ids |= sync_labels(db, assignments)
+    return matches, len(changed_ids)
+
+def recategorize_all(db: Session, chunk_size: int = 2000, progress: Optional[Callable[[int, int], None]] = None):
     """
     Finds all transactions and re-applies rules (categorization + labels).
     Tracks both total rule matches and actual transaction modifications.
+
+    Transactions are streamed in keyed chunks of `chunk_size` (by id) and each
+    chunk is committed on its own, so memory stays bounded and the database
+    write lock is released between chunks. `progress(done, total)` is called
+    after every chunk.
     """
-    failed_rules = sync_rules(db)
-    transactions = db.query(models.Transaction).all()
-    changes = 0
+    failed_rules = get_categorizer(db)._failed_rules
+    total = db.query(func.count(models.Transaction.id)).filter(_NOT_MANUAL).scalar()
+
     matches = 0
-    for t in transactions:
-        if t.is_manual:
-            continue
-            
-        # Capture state before
-        old_state = (t.category_id, t.is_transfer, t.to_account_id, sorted([l.id for l in t.labels]))
-        
-        if categorize_transaction(db, t):
-            matches += 1
-        
-        # Capture state after
-        new_state = (t.category_id, t.is_transfer, t.to_account_id, sorted([l.id for l in t.labels]))
-        
-        if old_state != new_state:
-            changes += 1
-            
-    db.commit()
+    changes = 0
+    done = 0
+    last_id = 0
+    while True:
+        rows = db.query(*_STATE_COLUMNS).filter(_NOT_MANUAL, models.Transaction.id > last_id) \
+            .order_by(models.Transaction.id).limit(chunk_size).all()
+        if not rows:
+            break
+        chunk_matches, chunk_changes = _recategorize_rows(db, rows)
+        db.commit()
+
+        matches += chunk_matches
+        changes += chunk_changes
+        done += len(rows)
+        last_id = rows[-1].id
+        if progress:
+            progress(done, total)
+
     return matches, changes, failed_rules
 
+def recategorize_rule_change(db: Session, rule_id: int, old_pattern: Optional[str] = None, new_pattern: Optional[str] = None, chunk_size: int = 500):
+    """
+    Incremental counterpart of `recategorize_all` for a single created,
+    updated or deleted rule. See `recategorize_rule_changes`.
+    """
+    return recategorize_rule_changes(db, [(rule_id, old_pattern, new_pattern)], chunk_size=chunk_size)
+
+# Characters that re.IGNORECASE (see matcher.fold) matches against an ASCII
+# letter, but SQLite's ASCII-only LIKE does not
+_ASCII_LOOKALIKES = "\u0130\u0131\u017f\u212a"
+
+def _description_filter(pattern: str):
+    """
+    SQL condition that every description matching `pattern` satisfies, from
+    its required literal; None if no such condition can be derived.
+    """
+    literal = required_literal(pattern, re.IGNORECASE)
+    if literal is None:
+        return None
+    column = models.Transaction.description
+    escaped = literal.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    conditions = [column.like(f"%{escaped}%", escape="\\")]
+    conditions += [column.like(f"%{c}%") for c in _ASCII_LOOKALIKES if fold(c) in literal]
+    return or_(*conditions)
+
+def _any_description(patterns: List[re.Pattern]):
+    """SQL condition that any description matching one of `patterns` satisfies."""
+    if not patterns:
+        return false()
+    filters = [_description_filter(p.pattern) for p in patterns]
+    if any(f is None for f in filters):
+        return None
+    return or_(*filters)
+
+def recategorize_rule_changes(db: Session, rule_changes: List[Tuple[int, Optional[str], Optional[str]]], chunk_size: int = 500, progress: Optional[Callable[[int, int], None]] = None):
+    """
+    Re-categorizes only the transactions affected by a set of rule changes,
+    each given as (rule_id, old_pattern, new_pattern); old_pattern is None for
+    a created rule and new_pattern is None for a deleted one.
+
+    A rule can only influence transactions it matched before or matches now.
+    Previous matches come from the provenance columns (an indexed lookup);
+    only rows categorized without known provenance are re-checked against the
+    old patterns. New matches are looked for among the rows whose description
+    contains the pattern's required literal (a LIKE in SQL), or among all rows
+    if a pattern has none. Affected transactions are re-evaluated with the
+    full rule waterfall, which also covers results that previously came from
+    a lower-priority rule.
+
+    Returns (matches, changes, failed_rules), where matches is the number of
+    transactions the new patterns match.
+    """
+    failed_rules = get_categorizer(db)._failed_rules
+
+    def _compile(pattern):
+        if pattern is None:
+            return None
+        try:
+            return re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            return None
+
+    old_res = [r for r in (_compile(old) for _, old, _ in rule_changes) if r is not None]
+    new_res = [r for r in (_compile(new) for _, _, new in rule_changes) if r is not None]
+
+    affected_ids = set()
+    for rule_id, _, _ in rule_changes:
+        affected_ids.update(tx_id for (tx_id,) in rule_transactions_query(db, rule_id).filter(_NOT_MANUAL).with_entities(models.Transaction.id))
+
+    matched_ids = set()
+    if new_res or old_res:
+        unknown_provenance = (models.Transaction.matched_rule_id == None) & (
+            (models.Transaction.category_id != None) | (models.Transaction.is_transfer == 1)
+        )
+        rows = db.query(models.Transaction.id, models.Transaction.description, unknown_provenance).filter(_NOT_MANUAL)
+        new_filter = _any_description(new_res)
+        old_filter = _any_description(old_res)
+        if new_filter is not None:
+            rows = rows.filter(or_(new_filter, unknown_provenance & (old_filter if old_filter is not None else true())))
+
+        seen = {}
+        for tx_id, description, is_unknown in rows:
+            description = description or ""
+            key = (description, bool(is_unknown))
+            hit = seen.get(key)
+            if hit is None:
+                is_new = any(r.search(description) for r in new_res)
+                hit = seen[key] = (is_new, is_new or bool(is_unknown and any(r.search(description) for r in old_res)))
+            if hit[0]:
+                matched_ids.add(tx_id)
+            if hit[1]:
+                affected_ids.add(tx_id)
+
+    affected_ids = sorted(affected_ids)
+    changes = 0
+    for start in range(0, len(affected_ids), chunk_size):
+        chunk = affected_ids[start:start + chunk_size]
+        rows = db.query(*_STATE_COLUMNS).filter(models.Transaction.id.in_(chunk)).all()
+        changes += _recategorize_rows(db, rows)[1]
+        if progress:
+            progress(start + len(chunk), len(affected_ids))
+
+    db.commit()
+    return len(matched_ids), changes, failed_rules
+
 # Placeholder for AI/ML training call
 def train_categorizer(db: Session, csv_path: str):
     categorizer = get_categorizer(db)
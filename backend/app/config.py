@@ -1,5 +1,7 @@
 import json
 import os
+import threading
+import time
 
 # Determine the project root and the data directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,7 +12,28 @@ CONFIG_PATH = os.path.join(DATA_DIR, "config.json")
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR, exist_ok=True)
 
-def get_config():
+# config.json is read once and then served from memory. Changes made by other
+# processes are picked up by checking its mtime at most this often (seconds);
+# save_config() updates the in-memory copy right away.
+CONFIG_CHECK_INTERVAL = 1.0
+
+class _ConfigCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.config = None
+        self.db_path = None
+        self.mtime = None
+        self.checked_at = 0.0
+
+_cache = _ConfigCache()
+
+def _config_mtime():
+    try:
+        return os.stat(CONFIG_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _load_config():
     if not os.path.exists(CONFIG_PATH):
         # Check environment variable as fallback for first-run
         env_db = os.environ.get("CURRENT_DB")
@@ -20,12 +43,7 @@ def get_config():
     with open(CONFIG_PATH, "r") as f:
         return json.load(f)
 
-def save_config(config):
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(config, f, indent=4)
-
-def get_db_path():
-    config = get_config()
+def _resolve_db_path(config):
     db_name = config.get("current_db")
     if not db_name:
         return None
@@ -36,3 +54,77 @@ def get_db_path():
         
     # Otherwise, assume it's in DATA_DIR
     return os.path.join(DATA_DIR, os.path.basename(db_name))
+
+def _set_config(config, mtime):
+    _cache.config = config
+    _cache.db_path = _resolve_db_path(config)
+    _cache.mtime = mtime
+    _cache.checked_at = time.monotonic()
+
+def _current():
+    """Returns the cache, reloading config.json if it changed since the last check."""
+    if _cache.config is not None and time.monotonic() - _cache.checked_at < CONFIG_CHECK_INTERVAL:
+        return _cache
+    with _cache.lock:
+        mtime = _config_mtime()
+        if _cache.config is None or mtime != _cache.mtime:
+            _set_config(_load_config(), mtime)
+        else:
+            _cache.checked_at = time.monotonic()
+    return _cache
+
+def reload_config():
+    """Drops the in-memory config so the next access reads config.json again."""
+    with _cache.lock:
+        _cache.config = None
+
+def get_config():
+    # A copy, callers modify it before passing it to save_config()
+    return dict(_current().config)
+
+def save_config(config):
+    with _cache.lock:
+        with open(CONFIG_PATH, "w") as f:
+            json.dump(config, f, indent=4)
+        _set_config(dict(config), _config_mtime())
+
+def get_db_path():
+    return _current().db_path
+
+# SQLite connection tuning, applied to every new connection (see database.py).
+# WAL lets readers (dashboard/analytics) run while an import or
+# re-categorization is writing; synchronous=NORMAL is safe with WAL and avoids
+# an fsync per commit. Values: cache_size < 0 is in KiB, mmap_size in bytes,
+# busy_timeout in milliseconds.
+SQLITE_PRESETS = {
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # WAL for concurrency, but fsync on every commit
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Plain SQLite defaults (rollback journal), e.g. for network file systems where WAL is unsupported
+    "compat": {},
+}
+DEFAULT_SQLITE_PRESET = "performance"
+
+def get_sqlite_pragmas():
+    """
+    Returns the pragmas to apply to new SQLite connections. The preset is taken
+    from config.json ("sqlite_preset") or the SQLITE_PRESET environment
+    variable; single pragmas can be overridden with "sqlite_pragmas".
+    """
+    config = get_config()
+    preset = config.get("sqlite_preset") or os.environ.get("SQLITE_PRESET") or DEFAULT_SQLITE_PRESET
+    pragmas = dict(SQLITE_PRESETS.get(preset, SQLITE_PRESETS[DEFAULT_SQLITE_PRESET]))
+    pragmas.update(config.get("sqlite_pragmas", {}))
+    return pragmas
@@ -1,32 +1,105 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from fastapi import HTTPException
 
 import os
+import threading
+from typing import Callable, Dict, List, Optional
 
-from .config import get_db_path
+from .config import get_db_path, get_sqlite_pragmas
 
-def get_engine():
-    db_path = get_db_path()
+def apply_sqlite_pragmas(engine, pragmas):
+    """Runs the given PRAGMAs on every new DBAPI connection of `engine`."""
+    if not pragmas:
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+class DatabaseEntry:
+    """Engine and session factory of one database file."""
+
+    def __init__(self, path: Optional[str], engine):
+        self.path = path
+        self.engine = engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class EngineRegistry:
+    """
+    Engines and session factories keyed by database path, created on first
+    use. Switching the selected database is a dictionary lookup; schema
+    creation and migrations run once per database, through the initializers
+    registered with `add_initializer`, when its engine is created.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[Optional[str], DatabaseEntry] = {}
+        self._initializers: List[Callable] = []
+
+    def add_initializer(self, initializer: Callable):
+        """Registers `initializer(engine)` to prepare every database on first use."""
+        self._initializers.append(initializer)
+
+    def get(self, db_path: Optional[str]) -> DatabaseEntry:
+        entry = self._entries.get(db_path)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._entries.get(db_path)
+            if entry is None:
+                entry = DatabaseEntry(db_path, _create_engine(db_path))
+                if db_path:
+                    for initializer in self._initializers:
+                        initializer(entry.engine)
+                self._entries[db_path] = entry
+            return entry
+
+    def dispose(self, db_path: Optional[str] = None):
+        """Closes the pooled connections of one database, or of all of them."""
+        with self._lock:
+            paths = list(self._entries) if db_path is None else [db_path]
+            for path in paths:
+                entry = self._entries.pop(path, None)
+                if entry is not None:
+                    entry.engine.dispose()
+
+def _create_engine(db_path: Optional[str]):
     if not db_path:
         # Return a dummy memory engine to avoid crashes on startup
         return create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
-    return create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    return apply_sqlite_pragmas(engine, get_sqlite_pragmas())
+
+# Process-wide registry used by the API
+registry = EngineRegistry()
 
-engine = get_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_engine():
+    """The engine of the currently selected database."""
+    return registry.get(get_db_path()).engine
+
+def SessionLocal():
+    """A new session on the currently selected database (for scripts)."""
+    return registry.get(get_db_path()).session_factory()
 
 Base = declarative_base()
 
 def get_db():
-    if not get_db_path():
+    db_path = get_db_path()
+    if not db_path:
         raise HTTPException(status_code=400, detail="No database selected. Please create or select a database first.")
     
-    # We need to recreate the sessionmaker/engine if the config changed
-    # For now, let's just use the current engine. 
-    # Switching DBs triggers an app reload in main.py, so this is fine.
-    db = SessionLocal()
+    # Resolved per request, so selecting another database takes effect immediately
+    db = registry.get(db_path).session_factory()
     try:
         yield db
     finally:
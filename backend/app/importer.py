@@ -0,0 +1,99 @@
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .categorization import get_categorizer, sync_labels, category_state, label_assignment
+from .rollups import RollupDelta
+from .utils import ImportSummary
+
+def calculate_hash(date_val, amount_val, desc_val, acc_id) -> str:
+    # Deterministic string: Date|Amount|Description|AccountID
+    data_str = f"{date_val}|{amount_val}|{desc_val}|{acc_id}"
+    return hashlib.sha256(data_str.encode()).hexdigest()
+
+def existing_hashes(db: Session, hashes: List[str], chunk_size: int = 500) -> set:
+    """Returns the subset of `hashes` already stored in the transactions table."""
+    found = set()
+    for start in range(0, len(hashes), chunk_size):
+        chunk = hashes[start:start + chunk_size]
+        found.update(db.scalars(
+            select(models.Transaction.transaction_hash).where(models.Transaction.transaction_hash.in_(chunk))
+        ))
+    return found
+
+def import_transactions(db: Session, rows: List[Dict[str, Any]], summary: Optional[ImportSummary] = None,
+                        chunk_size: int = 500) -> int:
+    """
+    Bulk-inserts parsed rows (date, amount, description, raw_data, account_id,
+    transaction_hash) that are not in the database yet.
+
+    Duplicates are found with one IN query per chunk of hashes instead of a
+    savepoint per row; the remaining rows are categorized in one batch and
+    written with a single executemany INSERT ... ON CONFLICT DO NOTHING, so
+    rows imported concurrently by someone else are skipped as well. The
+    analytics rollup is updated for the inserted rows.
+    Does not commit. Returns the number of inserted transactions.
+    """
+    summary = summary if summary is not None else ImportSummary()
+
+    with summary.phase("dedupe"):
+        known = existing_hashes(db, [r["transaction_hash"] for r in rows], chunk_size)
+        new_rows = []
+        for r in rows:
+            if r["transaction_hash"] in known:
+                summary.fail("duplicate")
+                continue
+            # Repeated rows within the same file count as duplicates too
+            known.add(r["transaction_hash"])
+            new_rows.append(r)
+
+    if not new_rows:
+        return 0
+
+    with summary.phase("categorize"):
+        categorized = get_categorizer(db).categorize_many([r["description"] for r in new_rows])
+        values = []
+        for r, cat_str, rule_id in zip(new_rows, categorized["category"], categorized["rule_id"]):
+            category_id, is_transfer, to_account_id, matched_rule_id = category_state((None, 0, None, None), cat_str, rule_id)
+            values.append({
+                "date": r["date"],
+                "amount": r["amount"],
+                "description": r["description"],
+                "raw_data": r["raw_data"],
+                "account_id": r["account_id"],
+                "transaction_hash": r["transaction_hash"],
+                "category_id": category_id,
+                "is_transfer": is_transfer,
+                "to_account_id": to_account_id,
+                "matched_rule_id": matched_rule_id,
+                "is_manual": 0,
+            })
+
+    with summary.phase("insert"):
+        table = models.Transaction.__table__
+        stmt = (sqlite_insert(table).on_conflict_do_nothing()
+                .returning(table.c.id, table.c.transaction_hash))
+        ids = {}
+        for start in range(0, len(values), chunk_size):
+            ids.update({h: tx_id for tx_id, h in db.execute(stmt, values[start:start + chunk_size])})
+        summary.fail("duplicate", len(values) - len(ids))
+
+        delta = RollupDelta()
+        for v in values:
+            if v["transaction_hash"] in ids:
+                delta.add(v["date"], v["account_id"], v["category_id"], v["is_transfer"], v["amount"])
+        delta.apply(db)
+
+        assignments = {}
+        for r, labels, label_rule_ids in zip(new_rows, categorized["labels"], categorized["label_rule_ids"]):
+            tx_id = ids.get(r["transaction_hash"])
+            if tx_id is not None and labels:
+                assignments[tx_id] = label_assignment(labels, label_rule_ids)
+        if assignments:
+            sync_labels(db, assignments, chunk_size)
+
+    return len(ids)
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import categorization
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around so clients can still poll their result
+MAX_FINISHED_JOBS = 100
+
+class Job:
+    """A queued re-categorization run and its progress/result."""
+
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = "rules"
+        self.rule_changes: List[Tuple[int, Optional[str], Optional[str]]] = []
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.done = 0
+        self.total = 0
+        self.matches = 0
+        self.changes = 0
+        self.failed_rules: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "matches": self.matches,
+            "changes": self.changes,
+            "failed_rules": self.failed_rules,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobRunner:
+    """
+    Runs re-categorization jobs on a single background thread, so writes to a
+    database never overlap.
+
+    Jobs are coalesced per database while they wait in the queue: a full
+    re-categorization absorbs any other queued work, and rule changes made in
+    quick succession are merged into one incremental job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue: deque = deque()
+        self._pending: Dict[str, Job] = {}
+        self._factories: Dict[str, Callable[[], Session]] = {}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, session_factory: Callable[[], Session], key: str,
+               rule_change: Optional[Tuple[int, Optional[str], Optional[str]]] = None) -> Job:
+        """
+        Queues a re-categorization for the database identified by `key`.
+        With `rule_change` (rule_id, old_pattern, new_pattern) only the
+        affected transactions are re-evaluated, otherwise all of them.
+        Returns the (possibly already queued) job that will do the work.
+        """
+        with self._lock:
+            job = self._pending.get(key)
+            if job is None:
+                job = Job(key)
+                self._pending[key] = job
+                self._factories[job.id] = session_factory
+                self._jobs[job.id] = job
+                self._queue.append(job)
+                self._prune()
+
+            if rule_change is None:
+                job.kind = "all"
+                job.rule_changes = []
+            elif job.kind == "rules":
+                job.rule_changes.append(rule_change)
+
+            self._ensure_worker()
+            self._wakeup.notify()
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """Blocks until the job has finished (mainly for scripts and tests)."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            job = self._jobs.get(job_id)
+            while job is not None and job.status in ("queued", "running"):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._wakeup.wait(remaining)
+            return job
+
+    def _prune(self):
+        finished = [j.id for j in self._jobs.values() if j.status in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._work, name="recategorize-jobs", daemon=True)
+            self._thread.start()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._wakeup.wait()
+                job = self._queue.popleft()
+                # From here on new submissions start a fresh job
+                self._pending.pop(job.key, None)
+                session_factory = self._factories.pop(job.id)
+                job.status = "running"
+                job.started_at = time.time()
+
+            self._run(job, session_factory)
+
+            with self._lock:
+                job.finished_at = time.time()
+                self._wakeup.notify_all()
+
+    def _run(self, job: Job, session_factory: Callable[[], Session]):
+        def progress(done: int, total: int):
+            job.done = done
+            job.total = total
+
+        db = session_factory()
+        try:
+            if job.kind == "all":
+                matches, changes, failed_rules = categorization.recategorize_all(db, progress=progress)
+            else:
+                matches, changes, failed_rules = categorization.recategorize_rule_changes(db, job.rule_changes, progress=progress)
+            job.matches, job.changes, job.failed_rules = matches, changes, failed_rules
+            job.status = "completed"
+            logger.info("Job %s (%s) completed: %d matches, %d changes", job.id, job.kind, job.matches, job.changes)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            db.rollback()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            db.close()
+
+# Process-wide runner used by the API
+runner = JobRunner()
+
+def submit_recategorization(db: Session, rule_change: Optional[Tuple[int, Optional[str], Optional[str]]] = None) -> Job:
+    """Queues a re-categorization against the database `db` is bound to."""
+    bind = db.get_bind()
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+    return runner.submit(session_factory, str(bind.url), rule_change)
@@ -0,0 +1,24 @@
+import logging
+import os
+
+# Modules log through logging.getLogger(__name__), i.e. below the "app" logger
+APP_LOGGER = "app"
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+def setup_logging(level: str = None):
+    """
+    Configures the application's loggers. The level defaults to INFO and can be
+    set with the SIEXAN_LOG_LEVEL environment variable (e.g. DEBUG).
+    Safe to call more than once.
+    """
+    level = (level or os.environ.get("SIEXAN_LOG_LEVEL", "INFO")).upper()
+    logger = logging.getLogger(APP_LOGGER)
+    logger.setLevel(level)
+    if not any(getattr(h, "_siexan", False) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handler._siexan = True
+        logger.addHandler(handler)
+        # Avoid duplicate lines when the server also configures the root logger
+        logger.propagate = False
+    return logger
@@ -1,87 +1,84 @@
 import os
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Body, APIRouter, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-import pandas as pd
+from typing import List, Optional, Union
+from datetime import date
+from sqlalchemy import or_
+import base64
 import io
+import json
+import logging
 
-from . import models, schemas, categorization, seed
-from .database import SessionLocal, engine, get_db, Base
+from . import models, schemas, categorization, seed, jobs, rollups, analytics, migrations
+from .analytics import AnalyticsFilters
+from .cache import response_cache
+from .database import registry, get_db
 from .config import get_config, save_config, get_db_path, DATA_DIR
+from .logging_config import setup_logging
 
-# Ensure tables exist on startup only if a DB is selected
-if get_db_path():
-    Base.metadata.create_all(bind=engine)
+setup_logging()
+logger = logging.getLogger(__name__)
 
-    # Migration: Add is_manual column to transactions if it doesn't exist
-    try:
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            # Check if column exists
-            result = conn.execute(text("PRAGMA table_info(transactions)"))
-            columns = [row[1] for row in result]
-            if "is_manual" not in columns:
-                print("DEBUG: Migration - Adding is_manual column to transactions table")
-                conn.execute(text("ALTER TABLE transactions ADD COLUMN is_manual INTEGER DEFAULT 0"))
-            
-            result_cat = conn.execute(text("PRAGMA table_info(categories)"))
-            columns_cat = [row[1] for row in result_cat]
-            if "target_account_id" not in columns_cat:
-                print("DEBUG: Migration - Adding target_account_id to categories table")
-                conn.execute(text("ALTER TABLE categories ADD COLUMN target_account_id INTEGER REFERENCES accounts(id)"))
-            
-            # Migration: Update categories unique constraint
-            try:
-                # 1. Drop old global unique index if it exists
-                conn.execute(text("DROP INDEX IF EXISTS ix_categories_name"))
-                # 2. Create new per-parent unique index
-                conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uix_category_name_parent ON categories (name, parent_id)"))
-                print("DEBUG: Migration - Updated categories unique constraint to (name, parent_id)")
-                conn.commit()
-            except Exception as ex:
-                print(f"DEBUG: Category uniqueness migration note: {ex}")
-                conn.rollback()
-
-            result_rule = conn.execute(text("PRAGMA table_info(categorization_rules)"))
-            columns_rule = [row[1] for row in result_rule]
-            if "priority" not in columns_rule:
-                print("DEBUG: Migration - Adding priority to categorization_rules table")
-                conn.execute(text("ALTER TABLE categorization_rules ADD COLUMN priority INTEGER DEFAULT 0"))
-            
-            conn.commit()
-    except Exception as e:
-        print(f"DEBUG: Migration failed or column exists: {e}")
+def sync_transfer_categories(db: Session) -> bool:
+    """
+    Ensures a 'Transfer' parent category exists and has a sub-category for
+    each account, named after it. Run at startup and whenever accounts are
+    created or renamed, never on reads. Commits only if something changed.
+    """
+    changed = False
 
-def sync_transfer_categories(db: Session):
-    """Ensures a 'Transfer' parent category exists and has sub-categories for each account."""
     # 1. Ensure 'Transfer' parent exists
     transfer_parent = db.query(models.Category).filter(models.Category.name == "Transfer", models.Category.parent_id == None).first()
     if not transfer_parent:
         transfer_parent = models.Category(name="Transfer")
         db.add(transfer_parent)
-        db.commit()
-        db.refresh(transfer_parent)
+        db.flush()
+        changed = True
     
-    # 2. Sync sub-categories for each account
-    accounts = db.query(models.Account).all()
-    for acc in accounts:
-        # Check if sub-category exists for this account
-        existing = db.query(models.Category).filter(
+    # 2. Sync sub-categories for each account, loaded with one query
+    existing = {
+        cat.target_account_id: cat
+        for cat in db.query(models.Category).filter(
             models.Category.parent_id == transfer_parent.id,
-            models.Category.target_account_id == acc.id
-        ).first()
-        
-        if not existing:
-            # Create sub-category
-            # Note: We use a specific name pattern, e.g., "-> Savings"
-            cat_name = f"↳ {acc.name}"
-            sub_cat = models.Category(name=cat_name, parent_id=transfer_parent.id, target_account_id=acc.id)
-            db.add(sub_cat)
-            print(f"DEBUG: Created transfer category for account {acc.name}")
-    
-    db.commit()
+            models.Category.target_account_id != None
+        )
+    }
+    for acc in db.query(models.Account).all():
+        # Note: We use a specific name pattern, e.g., "↳ Savings"
+        cat_name = f"↳ {acc.name}"
+        sub_cat = existing.get(acc.id)
+        if sub_cat is None:
+            db.add(models.Category(name=cat_name, parent_id=transfer_parent.id, target_account_id=acc.id))
+            logger.info("Created transfer category for account %s", acc.name)
+            changed = True
+        elif sub_cat.name != cat_name:
+            # The account was renamed
+            sub_cat.name = cat_name
+            logger.info("Renamed transfer category for account %s", acc.name)
+            changed = True
+    # Sub-categories of deleted accounts are kept, transactions may still reference them
+    
+    if changed:
+        db.commit()
+    return changed
+
+def prepare_database(engine):
+    """Runs once per database, when it is first used by this process."""
+    logger.info("Opening database %s", engine.url.database)
+    try:
+        migrations.upgrade(engine)
+    except Exception:
+        logger.exception("Migrating database %s failed", engine.url.database)
+    # Transfer categories of databases created or changed by older versions
+    try:
+        with Session(bind=engine) as db:
+            sync_transfer_categories(db)
+    except Exception as e:
+        logger.warning("Could not sync transfer categories: %s", e)
+
+registry.add_initializer(prepare_database)
 
 app = FastAPI(title="siexan - Simple Expense Analyser")
 
@@ -159,12 +156,11 @@ def select_database(db_name: str, create_if_missing: bool = False):
     config["current_db"] = db_name
     save_config(config)
     
-    # Force a reload of the app by touching main.py if we were in production, 
-    # but uvicorn --reload won't see config.json. 
-    # We can try to touch this file to trigger a reload.
-    os.utime(__file__, None)
+    # Switches in-process: the next request resolves the new database in
+    # get_db. Opening it here creates and migrates it right away if needed.
+    registry.get(get_db_path())
     
-    return {"message": f"Database switched to {db_name}. App is reloading..."}
+    return {"message": f"Database switched to {db_name}."}
 
 @app.post("/databases/create")
 def create_database(db_name: str):
@@ -176,12 +172,13 @@ def create_database(db_name: str):
     if os.path.exists(db_path):
         raise HTTPException(status_code=400, detail="Database already exists")
     
-    # Selecting it with create_if_missing=True will trigger schema creation on reload
+    # Selecting it with create_if_missing=True creates the schema
     return select_database(db_name, create_if_missing=True)
 
 @app.post("/seed/")
 def run_seed(db: Session = Depends(get_db)):
     seed.seed_db(db)
+    sync_transfer_categories(db)
     return {"message": "Database seeded successfully"}
 
 @app.post("/databases/populate")
@@ -189,10 +186,10 @@ def populate_example(db: Session = Depends(get_db)):
     import generate_example
     try:
         count = generate_example.populate_example_data(db)
+        sync_transfer_categories(db)
         return {"message": f"Successfully populated {count} example transactions."}
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to populate example data")
         raise HTTPException(status_code=500, detail=f"Failed to populate example data: {str(e)}")
 
 @app.get("/")
@@ -254,10 +251,12 @@ def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)
     return db_account
 
 @app.get("/accounts/", response_model=List[schemas.Account])
-def read_accounts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    sync_transfer_categories(db)
-    accounts = db.query(models.Account).offset(skip).limit(limit).all()
-    return accounts
+def read_accounts(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    # Pure read, served from the response cache until the next write
+    def compute():
+        accounts = db.query(models.Account).offset(skip).limit(limit).all()
+        return [schemas.Account.model_validate(a) for a in accounts]
+    return response_cache.respond(request, db, compute)
 
 # --- Category Endpoints ---
 
@@ -291,27 +290,31 @@ def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_
     return last_cat
 
 @app.get("/categories/", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    sync_transfer_categories(db)
-    categories = db.query(models.Category).all()
-    return categories
+def read_categories(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    # Pure read, served from the response cache until the next write
+    def compute():
+        categories = db.query(models.Category).all()
+        return [schemas.Category.model_validate(c) for c in categories]
+    return response_cache.respond(request, db, compute)
 
 # --- Categorization Rules ---
 
+# Rule changes and the full re-categorization run on the job runner unless
+# called with `background=false`; poll GET /jobs/{job_id} for the matches and changes
 @app.post("/rules/")
-def create_rule(rule: schemas.CategorizationRuleCreate, db: Session = Depends(get_db)):
+def create_rule(rule: schemas.CategorizationRuleCreate, background: bool = True, db: Session = Depends(get_db)):
     db_rule = models.CategorizationRule(**rule.dict())
     db.add(db_rule)
     db.commit()
     db.refresh(db_rule)
     
-    # Reload rules in memory
-    from .categorization import sync_rules
-    sync_rules(db)
-    
-    # Auto-trigger categorization
-    from .categorization import recategorize_all
-    matches, changes, _ = recategorize_all(db)
+    if background:
+        job = jobs.submit_recategorization(db, (db_rule.id, None, db_rule.pattern))
+        return {"rule": db_rule, "job_id": job.id, "status": job.status}
+
+    # Reload rules and re-categorize the transactions the new rule can affect
+    from .categorization import recategorize_rule_change
+    matches, changes, _ = recategorize_rule_change(db, db_rule.id, new_pattern=db_rule.pattern)
     
     return {
         "rule": db_rule,
@@ -329,11 +332,12 @@ def read_rules(db: Session = Depends(get_db)):
     ).order_by(models.CategorizationRule.priority.asc()).all()
 
 @app.put("/rules/{rule_id}")
-def update_rule(rule_id: int, rule_update: schemas.CategorizationRuleUpdate, db: Session = Depends(get_db)):
+def update_rule(rule_id: int, rule_update: schemas.CategorizationRuleUpdate, background: bool = True, db: Session = Depends(get_db)):
     db_rule = db.query(models.CategorizationRule).filter(models.CategorizationRule.id == rule_id).first()
     if not db_rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     
+    old_pattern = db_rule.pattern
     update_data = rule_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_rule, key, value)
@@ -341,13 +345,13 @@ def update_rule(rule_id: int, rule_update: schemas.CategorizationRuleUpdate, db:
     db.commit()
     db.refresh(db_rule)
     
-    # Reload rules in memory
-    from .categorization import sync_rules
-    sync_rules(db)
-    
-    # Auto-trigger categorization
-    from .categorization import recategorize_all
-    matches, changes, _ = recategorize_all(db)
+    if background:
+        job = jobs.submit_recategorization(db, (rule_id, old_pattern, db_rule.pattern))
+        return {"rule": db_rule, "job_id": job.id, "status": job.status}
+
+    # Reload rules and re-categorize the transactions the old or new pattern can affect
+    from .categorization import recategorize_rule_change
+    matches, changes, _ = recategorize_rule_change(db, rule_id, old_pattern=old_pattern, new_pattern=db_rule.pattern)
     
     return {
         "rule": db_rule,
@@ -356,26 +360,37 @@ def update_rule(rule_id: int, rule_update: schemas.CategorizationRuleUpdate, db:
     }
 
 @app.delete("/rules/{rule_id}")
-def delete_rule(rule_id: int, db: Session = Depends(get_db)):
+def delete_rule(rule_id: int, background: bool = True, db: Session = Depends(get_db)):
     db_rule = db.query(models.CategorizationRule).filter(models.CategorizationRule.id == rule_id).first()
     if not db_rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     
+    old_pattern = db_rule.pattern
     db.delete(db_rule)
     db.commit()
 
-    # Reload rules in memory
-    from .categorization import sync_rules
-    sync_rules(db)
-    
-    # Auto-trigger categorization to reset transactions
-    from .categorization import recategorize_all
-    matches, changes, _ = recategorize_all(db)
+    if background:
+        job = jobs.submit_recategorization(db, (rule_id, old_pattern, None))
+        return {"message": "Rule deleted", "job_id": job.id, "status": job.status}
+
+    # Reload rules and reset the transactions the deleted rule matched
+    from .categorization import recategorize_rule_change
+    matches, changes, _ = recategorize_rule_change(db, rule_id, old_pattern=old_pattern)
     
     return {"message": "Rule deleted", "matches": matches, "changes": changes}
 
+@app.get("/rules/{rule_id}/transactions", response_model=List[schemas.Transaction])
+def read_rule_transactions(rule_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    """Transactions whose category or labels were assigned by this rule."""
+    from .categorization import rule_transactions_query
+    return rule_transactions_query(db, rule_id).order_by(models.Transaction.date.desc()).offset(skip).limit(limit).all()
+
 @app.post("/rules/re-categorize/")
-def recategorize_transactions(db: Session = Depends(get_db)):
+def recategorize_transactions(background: bool = True, db: Session = Depends(get_db)):
+    if background:
+        job = jobs.submit_recategorization(db)
+        return {"message": "Re-categorization queued.", "job_id": job.id, "status": job.status}
+
     from .categorization import recategorize_all
     try:
         matches, changes, failed_rules = recategorize_all(db)
@@ -386,10 +401,18 @@ def recategorize_transactions(db: Session = Depends(get_db)):
             "failed_rules": failed_rules
         }
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Re-categorization failed")
         raise HTTPException(status_code=500, detail=f"Re-categorization failed: {str(e)}")
 
+# --- Background Jobs ---
+
+@app.get("/jobs/{job_id}")
+def read_job(job_id: str):
+    job = jobs.runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 # --- Import/Export Endpoints ---
 
 @app.get("/profiles/export/")
@@ -509,88 +532,15 @@ def import_rules(data: dict, db: Session = Depends(get_db)):
         "skipped_rules": skipped_rule
     }
 
-@app.post("/migrate-labels")
-def run_migration_labels(db: Session = Depends(get_db)):
-    try:
-        from sqlalchemy import text
-        # 1. Create labels table
-        db.execute(text("""
-            CREATE TABLE IF NOT EXISTS labels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                color TEXT DEFAULT '#6366f1'
-            )
-        """))
-        
-        # 2. Create transaction_labels association table
-        db.execute(text("""
-            CREATE TABLE IF NOT EXISTS transaction_labels (
-                transaction_id INTEGER,
-                label_id INTEGER,
-                PRIMARY KEY (transaction_id, label_id),
-                FOREIGN KEY (transaction_id) REFERENCES transactions (id),
-                FOREIGN KEY (label_id) REFERENCES labels (id)
-            )
-        """))
-        
-        # 3. Add target_label_id to categorization_rules
-        try:
-            db.execute(text("ALTER TABLE categorization_rules ADD COLUMN target_label_id INTEGER REFERENCES labels(id)"))
-        except Exception:
-            pass # Already exists
-            
-        db.commit()
-        return {"message": "Migration successful"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
 @app.post("/migrations/hashes")
-def run_migration_hashes(db: Session = Depends(get_db)):
-    import hashlib
-    from sqlalchemy import text
-    
-    # 1. Ensure column exists
-    try:
-        db.execute(text("ALTER TABLE transactions ADD COLUMN transaction_hash TEXT"))
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Note: Could not add column (likely exists): {e}")
-
-    # 2. Add unique index if possible
-    try:
-        db.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_transactions_transaction_hash ON transactions (transaction_hash)"))
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Note: Could not create unique index: {e}")
-
-    def calculate_hash(date_val, amount_val, desc_val, acc_id):
-        # Deterministic string: Date|Amount|Description|AccountID
-        data_str = f"{date_val}|{amount_val}|{desc_val}|{acc_id}"
-        return hashlib.sha256(data_str.encode()).hexdigest()
-
-    from sqlalchemy.exc import IntegrityError
-    # Fetch transactions that don't have a hash yet
-    transactions = db.query(models.Transaction).filter(models.Transaction.transaction_hash == None).all()
-    count = 0
-    duplicates = 0
-    for t in transactions:
-        tx_hash = calculate_hash(t.date, t.amount, t.description, t.account_id)
-        t.transaction_hash = tx_hash
-        try:
-            # Check for conflict with existing hashes
-            with db.begin_nested():
-                db.flush()
-            count += 1
-        except IntegrityError:
-            db.rollback()
-            # If a duplicate is found during migration, remove it
-            db.delete(t)
-            duplicates += 1
-            
+def remove_duplicate_transactions(db: Session = Depends(get_db)):
+    """
+    Deletes the transactions the hash migration left without a hash because
+    they duplicate another one. Never run automatically, since it deletes data.
+    """
+    removed = migrations.remove_duplicate_transactions(db)
     db.commit()
-    return {"message": f"Populated hashes for {count} transactions, removed {duplicates} duplicates."}
+    return {"message": f"Removed {removed} duplicate transactions.", "removed": removed}
 
 # --- Label Endpoints ---
 
@@ -607,8 +557,7 @@ def read_labels(db: Session = Depends(get_db)):
     try:
         return db.query(models.Label).all()
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to read labels")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/labels/{label_id}")
@@ -618,14 +567,92 @@ def delete_label(label_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Label not found")
     db.delete(db_label)
     db.commit()
+    # The categorizer's label cache is rebuilt on next use (see rules_version)
     return {"message": "Label deleted"}
 
 # --- Transaction Endpoints ---
 
-@app.get("/transactions/", response_model=List[schemas.Transaction])
+_LEAN_TRANSACTION_COLUMNS = (
+    "id", "date", "description", "amount", "account_id", "category_id",
+    "is_transfer", "to_account_id", "is_manual", "matched_rule_id",
+)
+
+def _lean_transaction_query(db: Session, include_raw: bool):
+    """Column projection of the transaction list, with category and transfer account joined in."""
+    from sqlalchemy.orm import aliased
+    to_account = aliased(models.Account)
+    columns = [getattr(models.Transaction, name) for name in _LEAN_TRANSACTION_COLUMNS]
+    columns += [
+        models.Category.id, models.Category.name, models.Category.parent_id, models.Category.target_account_id,
+        to_account.id, to_account.name, to_account.type,
+    ]
+    if include_raw:
+        columns.append(models.Transaction.raw_data)
+    return db.query(*columns).select_from(models.Transaction).outerjoin(
+        models.Category, models.Category.id == models.Transaction.category_id
+    ).outerjoin(to_account, to_account.id == models.Transaction.to_account_id)
+
+def _lean_transaction_rows(db: Session, rows, include_raw: bool) -> List[dict]:
+    """
+    Builds JSON-ready transaction dicts (same shape as schemas.Transaction)
+    from `_lean_transaction_query` rows; labels are fetched with one IN query
+    per 500 transactions.
+    """
+    from sqlalchemy import select
+    tl = models.transaction_labels
+    labels = {}
+    ids = [row[0] for row in rows]
+    for start in range(0, len(ids), 500):
+        for tx_id, label_id, name, color in db.execute(
+            select(tl.c.transaction_id, models.Label.id, models.Label.name, models.Label.color)
+            .join(models.Label, models.Label.id == tl.c.label_id)
+            .where(tl.c.transaction_id.in_(ids[start:start + 500]))
+        ):
+            labels.setdefault(tx_id, []).append({"id": label_id, "name": name, "color": color})
+
+    result = []
+    for row in rows:
+        (tx_id, tx_date, description, amount, account_id, category_id, is_transfer, to_account_id,
+         is_manual, matched_rule_id, cat_id, cat_name, cat_parent_id, cat_target_account_id,
+         to_acc_id, to_acc_name, to_acc_type) = row[:17]
+        result.append({
+            "id": tx_id,
+            "date": tx_date.isoformat() if tx_date else None,
+            "description": description,
+            "amount": amount,
+            "account_id": account_id,
+            "category_id": category_id,
+            "is_transfer": bool(is_transfer),
+            "to_account_id": to_account_id,
+            "raw_data": row[17] if include_raw else None,
+            "is_manual": bool(is_manual),
+            "matched_rule_id": matched_rule_id,
+            "category": None if cat_id is None else {
+                "id": cat_id, "name": cat_name, "parent_id": cat_parent_id, "target_account_id": cat_target_account_id,
+            },
+            "to_account": None if to_acc_id is None else {"id": to_acc_id, "name": to_acc_name, "type": to_acc_type},
+            "labels": labels.get(tx_id, []),
+        })
+    return result
+
+def _encode_cursor(tx_date: Optional[date], tx_id: int) -> str:
+    # Transactions without a date are encoded as null
+    payload = json.dumps([tx_date.isoformat() if tx_date is not None else None, tx_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    """Returns the (date or None, id) position encoded in a cursor."""
+    try:
+        raw_date, tx_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (date.fromisoformat(raw_date) if raw_date is not None else None), int(tx_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/transactions/", response_model=Union[List[schemas.Transaction], schemas.TransactionPage])
 def read_transactions(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     category_id: Optional[int] = None,
     is_uncategorized: Optional[bool] = None,
     start_date: Optional[str] = None,
@@ -633,14 +660,25 @@ def read_transactions(
     account_id: Optional[int] = None,
     min_amount: Optional[float] = None,
     max_amount: Optional[float] = None,
+    lean: bool = False,
+    include_raw: bool = False,
     db: Session = Depends(get_db)
 ):
-    from sqlalchemy.orm import joinedload
-    query = db.query(models.Transaction).options(
-        joinedload(models.Transaction.category),
-        joinedload(models.Transaction.to_account),
-        joinedload(models.Transaction.labels)
-    )
+    """
+    Lists transactions, newest first. `lean=true` skips ORM objects and
+    `raw_data` (unless `include_raw=true`) and builds the response rows
+    directly, which is considerably faster for large pages.
+    """
+    from sqlalchemy.orm import joinedload, selectinload
+    if lean:
+        query = _lean_transaction_query(db, include_raw)
+    else:
+        # selectinload for labels: joining the many-to-many would multiply rows before LIMIT
+        query = db.query(models.Transaction).options(
+            joinedload(models.Transaction.category),
+            joinedload(models.Transaction.to_account),
+            selectinload(models.Transaction.labels)
+        )
     
     if account_id is not None:
         query = query.filter(models.Transaction.account_id == account_id)
@@ -656,37 +694,54 @@ def read_transactions(
         query = query.filter(models.Transaction.amount >= min_amount)
     if max_amount is not None:
         query = query.filter(models.Transaction.amount <= max_amount)
-        
-    transactions = query.order_by(models.Transaction.date.desc()).offset(skip).limit(limit).all()
-    return transactions
+
+    # Newest first, transactions without a date last; id breaks ties between transactions of the same day
+    query = query.order_by(models.Transaction.date.desc().nulls_last(), models.Transaction.id.desc())
+
+    if cursor is None:
+        # Offset pagination (returns a plain list)
+        transactions = query.offset(skip).limit(limit).all()
+        if lean:
+            return JSONResponse(_lean_transaction_rows(db, transactions, include_raw))
+        return transactions
+
+    # Keyset pagination: pass cursor="" for the first page, then the returned next_cursor.
+    # "date <= d" keeps the date index usable as a range scan.
+    # Transactions without a date come after all dated ones; they are fetched
+    # separately, since an OR with "date IS NULL" would turn the range scan into a full scan.
+    undated = models.Transaction.date == None
+    if not cursor:
+        transactions = query.limit(limit + 1).all()
+    else:
+        after_date, after_id = _decode_cursor(cursor)
+        if after_date is None:
+            transactions = query.filter(undated, models.Transaction.id < after_id).limit(limit + 1).all()
+        else:
+            transactions = query.filter(
+                models.Transaction.date <= after_date,
+                or_(models.Transaction.date < after_date, models.Transaction.id < after_id)
+            ).limit(limit + 1).all()
+            if len(transactions) <= limit:
+                transactions += query.filter(undated).limit(limit + 1 - len(transactions)).all()
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        # Lean rows are tuples starting with (id, date, ...)
+        next_cursor = _encode_cursor(last[1], last[0]) if lean else _encode_cursor(last.date, last.id)
+    if lean:
+        return JSONResponse({"items": _lean_transaction_rows(db, transactions, include_raw), "next_cursor": next_cursor})
+    return {"items": transactions, "next_cursor": next_cursor}
 
 @app.get("/transactions/stats")
-def get_transaction_stats(
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    account_id: Optional[int] = None,
-    db: Session = Depends(get_db)
-):
-    query_total = db.query(models.Transaction)
-    query_uncat = db.query(models.Transaction).filter(
-        models.Transaction.category_id == None,
-        models.Transaction.is_transfer == 0
-    )
-    
-    if start_date:
-        query_total = query_total.filter(models.Transaction.date >= start_date)
-        query_uncat = query_uncat.filter(models.Transaction.date >= start_date)
-    if end_date:
-        query_total = query_total.filter(models.Transaction.date <= end_date)
-        query_uncat = query_uncat.filter(models.Transaction.date <= end_date)
-    if account_id is not None:
-        query_total = query_total.filter(models.Transaction.account_id == account_id)
-        query_uncat = query_uncat.filter(models.Transaction.account_id == account_id)
-        
-    return {
-        "total": query_total.count(),
-        "uncategorized": query_uncat.count()
-    }
+def get_transaction_stats(request: Request, filters: AnalyticsFilters = Depends(), db: Session = Depends(get_db)):
+    def compute():
+        totals = analytics.aggregate(db, (), filters).get((), analytics.Totals())
+        return {
+            "total": totals.count,
+            "uncategorized": totals.uncategorized
+        }
+    return response_cache.respond(request, db, compute)
 
 @app.patch("/transactions/{transaction_id}", response_model=schemas.Transaction)
 def update_transaction(transaction_id: int, tx_update: schemas.TransactionUpdate, db: Session = Depends(get_db)):
@@ -727,93 +782,115 @@ def update_transaction(transaction_id: int, tx_update: schemas.TransactionUpdate
 async def upload_csv(
     account_id: int,
     profile_id: int,
+    stream: bool = False,
+    chunk_size: int = 10000,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    import hashlib
-    def calculate_hash(date_val, amount_val, desc_val, acc_id):
-        # Deterministic string: Date|Amount|Description|AccountID
-        data_str = f"{date_val}|{amount_val}|{desc_val}|{acc_id}"
-        return hashlib.sha256(data_str.encode()).hexdigest()
+    """
+    Imports a CSV file using a profile. With `stream=true` the file is parsed,
+    deduplicated, categorized and inserted `chunk_size` rows at a time instead
+    of being loaded into memory as a whole. `summary.progress` in the response
+    records the rows and bytes read after each chunk.
+    """
+    from .importer import calculate_hash, import_transactions
+    from .utils import parse_csv_with_profile, iter_csv_with_profile, ImportSummary
 
     # 1. Get Profile
     profile = db.query(models.CSVProfile).filter(models.CSVProfile.id == profile_id).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
+    profile_dict = {
+        "column_mapping": profile.column_mapping,
+        "date_format": profile.date_format,
+        "delimiter": profile.delimiter,
+        "header_row": profile.header_row
+    }
         
-    # 2. Parse CSV
-    from .utils import parse_csv_with_profile
-    content = await file.read()
-    try:
-        parsed_transactions = parse_csv_with_profile(content, {
-            "column_mapping": profile.column_mapping,
-            "date_format": profile.date_format,
-            "delimiter": profile.delimiter,
-            "header_row": profile.header_row
-        })
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error parsing CSV: {str(e)}")
-        
-    # 3. Handle Account Mapping
+    # 2. Handle Account Mapping
     account_mapping = profile.column_mapping.get('account_mapping', {})
-    
-    # 4. Save Transactions with Deduplication
-    from .categorization import categorize_transaction
-    from sqlalchemy.exc import IntegrityError
-    
-    imported_count = 0
-    skipped_count = 0
-    skipped_duplicates = 0
-    unmapped_accounts = set()
     is_multi_account = bool(profile.column_mapping.get('account'))
-    
-    for t in parsed_transactions:
-        # Determine actual account for this row
-        final_account_id = account_id
-        if is_multi_account:
-            acc_str = t.get('account_string')
-            mapped_id = account_mapping.get(acc_str) if acc_str else None
-            # Only exact mappings allowed when using multi-account explicit mappings
-            if not mapped_id:
-                unmapped_accounts.add(acc_str if acc_str else "Empty Account")
-                skipped_count += 1
-                continue
-            final_account_id = int(mapped_id)
-        else:
-            # Single-account with optional override
-            if t.get('account_string'):
-                mapped_id = account_mapping.get(t['account_string'])
-                if mapped_id:
-                    final_account_id = int(mapped_id)
-        
-        tx_hash = calculate_hash(t['date'], t['amount'], t['description'], final_account_id)
-        
-        db_t = models.Transaction(
-            date=t['date'],
-            amount=t['amount'],
-            description=t['description'],
-            raw_data=t['raw_data'],
-            account_id=final_account_id,
-            transaction_hash=tx_hash
-        )
-        
+    unmapped_accounts = set()
+    summary = ImportSummary()
+
+    def prepare_rows(parsed_transactions):
+        rows = []
+        for t in parsed_transactions:
+            # Determine actual account for this row
+            final_account_id = account_id
+            if is_multi_account:
+                acc_str = t.get('account_string')
+                mapped_id = account_mapping.get(acc_str) if acc_str else None
+                # Only exact mappings allowed when using multi-account explicit mappings
+                if not mapped_id:
+                    unmapped_accounts.add(acc_str if acc_str else "Empty Account")
+                    summary.fail("unmapped account")
+                    continue
+                final_account_id = int(mapped_id)
+            else:
+                # Single-account with optional override
+                if t.get('account_string'):
+                    mapped_id = account_mapping.get(t['account_string'])
+                    if mapped_id:
+                        final_account_id = int(mapped_id)
+            
+            rows.append({
+                "date": t['date'],
+                "amount": t['amount'],
+                "description": t['description'],
+                "raw_data": t['raw_data'],
+                "account_id": final_account_id,
+                "transaction_hash": calculate_hash(t['date'], t['amount'], t['description'], final_account_id)
+            })
+        return rows
+
+    # 3. Parse CSV, then deduplicate against existing hashes, categorize in batch and bulk insert
+    def parse_error(e: Exception) -> HTTPException:
+        # Nothing from a partially streamed file is kept
+        db.rollback()
+        logger.warning("Error parsing CSV %s: %s", file.filename, e)
+        return HTTPException(status_code=400, detail=f"Error parsing CSV: {str(e)}")
+
+    imported_count = 0
+    prepared_count = 0
+    if stream:
+        file.file.seek(0)
+        chunks = iter_csv_with_profile(file.file, profile_dict, summary, chunksize=max(1, chunk_size))
+    else:
+        content = await file.read()
         try:
-            # We use a sub-transaction (savepoint) to catch IntegrityError without breaking the main transaction
-            with db.begin_nested():
-                db.add(db_t)
-                categorize_transaction(db, db_t)
-            imported_count += 1
-        except IntegrityError:
-            # Duplicate found via transaction_hash unique constraint
-            skipped_duplicates += 1
-            skipped_count += 1
-            continue
+            with summary.phase("parse"):
+                chunks = iter([parse_csv_with_profile(content, profile_dict, summary)])
         except Exception as e:
-            print(f"ERROR: Unexpected error importing transaction: {e}")
-            skipped_count += 1
-            continue
-            
+            raise parse_error(e)
+    while True:
+        try:
+            with summary.phase("parse"):
+                parsed_transactions = next(chunks, None)
+        except Exception as e:
+            raise parse_error(e)
+        if parsed_transactions is None:
+            break
+        summary.chunks += 1
+        with summary.phase("prepare"):
+            rows = prepare_rows(parsed_transactions)
+        prepared_count += len(rows)
+        imported_count += import_transactions(db, rows, summary)
+        summary.checkpoint(imported_count, file.file.tell(), file.size)
+        if stream:
+            logger.info(
+                "Importing %s: %d rows read, %d imported (%s of %s bytes)",
+                file.filename, summary.rows_total, imported_count, file.file.tell(), file.size
+            )
     db.commit()
+
+    skipped_count = summary.failures["unmapped account"] + prepared_count - imported_count
+    logger.info(
+        "Imported %s: %d of %d rows (%d skipped, %s) in %s",
+        file.filename, imported_count, summary.rows_total, summary.rows_total - imported_count,
+        dict(summary.failures) or "no failures",
+        ", ".join(f"{name} {ms}ms" for name, ms in summary.to_dict()["timings_ms"].items()),
+    )
     
     if unmapped_accounts:
         unmapped_str = ", ".join([f"'{a}'" for a in unmapped_accounts])
@@ -828,7 +905,8 @@ async def upload_csv(
         "message": msg,
         "imported": imported_count,
         "skipped": skipped_count,
-        "unmapped_accounts": list(unmapped_accounts)
+        "unmapped_accounts": list(unmapped_accounts),
+        "summary": summary.to_dict()
     }
 
 @app.delete("/transactions/{transaction_id}")
@@ -843,6 +921,8 @@ def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
 
 @app.delete("/transactions/bulk/")
 def bulk_delete_transactions(transaction_ids: List[int] = Body(...), db: Session = Depends(get_db)):
+    # A bulk delete bypasses the session, so the rollup is updated explicitly
+    rollups.remove_transactions(db, transaction_ids)
     db.query(models.Transaction).filter(models.Transaction.id.in_(transaction_ids)).delete(synchronize_session=False)
     db.commit()
     return {"message": f"{len(transaction_ids)} transactions deleted successfully"}
@@ -850,96 +930,72 @@ def bulk_delete_transactions(transaction_ids: List[int] = Body(...), db: Session
 # --- Analytics Endpoints ---
 
 @app.get("/analytics/monthly")
-def get_monthly_analytics(db: Session = Depends(get_db)):
-    from sqlalchemy import func
-    
-    # 1. Monthly income
-    income_query = db.query(
-        func.strftime('%Y-%m', models.Transaction.date).label("month"),
-        func.sum(models.Transaction.amount).label("inflow")
-    ).filter(
-        models.Transaction.is_transfer == 0,
-        models.Transaction.amount > 0
-    ).group_by("month").all()
-    
-    # 2. Monthly spending
-    spending_query = db.query(
-        func.strftime('%Y-%m', models.Transaction.date).label("month"),
-        func.sum(models.Transaction.amount).label("outflow")
-    ).filter(
-        models.Transaction.is_transfer == 0,
-        models.Transaction.amount < 0
-    ).group_by("month").all()
-    
-    # Merge results
-    months = sorted(list(set([r[0] for r in income_query] + [r[0] for r in spending_query])))
-    
-    income_map = {r[0]: r[1] for r in income_query}
-    spending_map = {r[0]: abs(r[1]) for r in spending_query}
-    
+def get_monthly_analytics(request: Request, filters: AnalyticsFilters = Depends(), db: Session = Depends(get_db)):
+    return response_cache.respond(request, db, lambda: _monthly_analytics(db, filters))
+
+def _monthly_analytics(db: Session, filters: AnalyticsFilters):
+    totals = analytics.aggregate(db, ("month",), filters)
     result = []
-    for m in months:
-        if not m: continue # Skip null months if any
+    for (month,), t in sorted(totals.items(), key=lambda item: item[0][0] or ""):
+        # Skip null months and months with only transfers or zero amounts
+        if not month or not (t.inflow or t.outflow):
+            continue
         result.append({
-            "month": m,
-            "inflow": income_map.get(m, 0.0),
-            "outflow": spending_map.get(m, 0.0)
+            "month": month,
+            "inflow": t.inflow,
+            "outflow": abs(t.outflow)
         })
-    
     return result
 
 @app.get("/analytics/summary")
-def get_summary(
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    from sqlalchemy import func
-    
-    # 1. Spending breakdown (Negative amounts)
-    spending_query = db.query(
-        models.Category.name,
-        models.Category.id,
-        func.sum(models.Transaction.amount).label("total")
-    ).select_from(models.Transaction).join(
-        models.Category, isouter=True
-    ).filter(models.Transaction.is_transfer == 0, models.Transaction.amount < 0)
-    
-    # 2. Income breakdown (Positive amounts)
-    income_categories_query = db.query(
-        models.Category.name,
-        models.Category.id,
-        func.sum(models.Transaction.amount).label("total")
-    ).select_from(models.Transaction).join(
-        models.Category, isouter=True
-    ).filter(models.Transaction.is_transfer == 0, models.Transaction.amount > 0)
-
-    if start_date:
-        spending_query = spending_query.filter(models.Transaction.date >= start_date)
-        income_categories_query = income_categories_query.filter(models.Transaction.date >= start_date)
-    if end_date:
-        spending_query = spending_query.filter(models.Transaction.date <= end_date)
-        income_categories_query = income_categories_query.filter(models.Transaction.date <= end_date)
-        
-    spending_summary = spending_query.group_by(models.Category.name, models.Category.id).all()
-    income_categories_summary = income_categories_query.group_by(models.Category.name, models.Category.id).all()
-    
-    total_income = sum(s[2] for s in income_categories_summary if s[2]) or 0.0
-    total_spending = sum(s[2] for s in spending_summary if s[2]) or 0.0
+def get_summary(request: Request, filters: AnalyticsFilters = Depends(), db: Session = Depends(get_db)):
+    return response_cache.respond(request, db, lambda: _summary(db, filters))
+
+def _summary(db: Session, filters: AnalyticsFilters):
+    totals = analytics.aggregate(db, ("category_id",), filters)
+    category_ids = {cat_id for (cat_id,) in totals if cat_id is not None}
+    names = dict(db.query(models.Category.id, models.Category.name).filter(models.Category.id.in_(category_ids)).all())
+
+    spending = {}
+    income = {}
+    for (cat_id,), t in totals.items():
+        # Unknown categories end up as "Uncategorized", like with the outer join
+        if cat_id not in names:
+            cat_id = None
+        if t.outflow:
+            spending[cat_id] = spending.get(cat_id, 0.0) + t.outflow
+        if t.inflow:
+            income[cat_id] = income.get(cat_id, 0.0) + t.inflow
+
+    def ordered(breakdown):
+        return sorted(breakdown.items(), key=lambda item: (names.get(item[0]) or "", item[0] or 0))
+
+    total_income = sum(income.values()) or 0.0
+    total_spending = sum(spending.values()) or 0.0
     
     return {
         "spending_categories": [
-            {"category": s[0] or "Uncategorized", "category_id": s[1], "total": abs(s[2]) if s[2] else 0.0} 
-            for s in spending_summary
+            {"category": names.get(cat_id) or "Uncategorized", "category_id": cat_id, "total": abs(total)}
+            for cat_id, total in ordered(spending)
         ],
         "income_categories": [
-            {"category": s[0] or "Uncategorized", "category_id": s[1], "total": s[2] if s[2] else 0.0} 
-            for s in income_categories_summary
+            {"category": names.get(cat_id) or "Uncategorized", "category_id": cat_id, "total": total}
+            for cat_id, total in ordered(income)
         ],
         "total_income": total_income,
         "total_spending": abs(total_spending)
     }
 
+@app.post("/analytics/rollups/rebuild")
+def rebuild_rollups(db: Session = Depends(get_db)):
+    """Recomputes the analytics rollup from scratch and reports how many keys had drifted."""
+    mismatches = rollups.check(db)
+    rows = rollups.rebuild(db)
+    db.commit()
+    if mismatches:
+        logger.warning("Rebuilt analytics rollup, %d keys had drifted", len(mismatches))
+    return {"rows": rows, "mismatches": len(mismatches)}
+
 # --- Static File Serving (for Docker) ---
 
 # Try to serve static files from /app/frontend/dist if it exists
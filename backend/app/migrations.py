@@ -0,0 +1,239 @@
+"""
+Versioned schema migrations.
+
+A database's schema version is stored in SQLite's `PRAGMA user_version`.
+`upgrade(engine)` applies the steps in MIGRATIONS that are newer than that
+version, in order, and records each one, so a database that is up to date
+costs a single PRAGMA read. It runs once per database and process, when the
+engine registry opens the database (see main.prepare_database), or by hand:
+
+    cd backend && python -m app.migrations status|upgrade [--db PATH]
+
+Step 3 never deletes data: transactions that duplicate another one are left
+without a hash and reported, and are only deleted by
+`python -m app.migrations remove-duplicates` or POST /migrations/hashes.
+
+New databases are created from the models and stamped with the latest
+version. Steps must be idempotent: databases from before versioning start at
+version 0 in any state, and a step interrupted half-way is simply run again.
+To change the schema, update the model and append a step.
+"""
+import argparse
+import logging
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, text, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable
+
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, description: str):
+    """Registers the decorated `apply(conn)` function as migration step `version`."""
+    def register(apply):
+        assert version == len(MIGRATIONS) + 1, "migration versions must be consecutive"
+        MIGRATIONS.append(Migration(version, description, apply))
+        return apply
+    return register
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+def _add_columns(conn, table: str, columns: dict):
+    existing = _columns(conn, table)
+    for name, ddl in columns.items():
+        if name not in existing:
+            logger.info("Migration - Adding %s to %s table", name, table)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+@migration(1, "Create missing tables and columns")
+def _tables_and_columns(conn):
+    # Replaces migrate_labels.py, migrate_transfers.py and the checks previously run at every startup
+    Base.metadata.create_all(bind=conn)
+    _add_columns(conn, "transactions", {
+        "is_transfer": "INTEGER DEFAULT 0",
+        "to_account_id": "INTEGER REFERENCES accounts(id)",
+        "transaction_hash": "TEXT",
+        "is_manual": "INTEGER DEFAULT 0",
+        "matched_rule_id": "INTEGER REFERENCES categorization_rules(id)",
+    })
+    _add_columns(conn, "categories", {"target_account_id": "INTEGER REFERENCES accounts(id)"})
+    _add_columns(conn, "categorization_rules", {
+        "priority": "INTEGER DEFAULT 0",
+        "target_account_id": "INTEGER REFERENCES accounts(id)",
+        "target_label_id": "INTEGER REFERENCES labels(id)",
+    })
+    _add_columns(conn, "transaction_labels", {"rule_id": "INTEGER REFERENCES categorization_rules(id)"})
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_transactions_matched_rule_id ON transactions (matched_rule_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_transaction_labels_rule_id ON transaction_labels (rule_id)"))
+
+@migration(2, "Make category names unique per parent")
+def _category_names(conn):
+    # Old databases had a global unique index on the name
+    for row in conn.execute(text("PRAGMA index_list(categories)")).all():
+        if row[1] == "ix_categories_name" and row[2]:
+            conn.execute(text("DROP INDEX ix_categories_name"))
+            conn.execute(text("CREATE INDEX ix_categories_name ON categories (name)"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uix_category_name_parent ON categories (name, parent_id)"))
+
+@migration(3, "Fill transaction hashes")
+def _transaction_hashes(conn):
+    # Replaces POST /migrations/hashes, except that duplicates are only removed on request
+    hashes, duplicates = _missing_hashes(conn)
+    if hashes:
+        conn.execute(text("UPDATE transactions SET transaction_hash = :hash WHERE id = :id"),
+                     [{"id": tx_id, "hash": tx_hash} for tx_id, tx_hash in hashes.items()])
+    if duplicates:
+        logger.warning(
+            "Migration - %d transactions duplicate an earlier one and were left without a hash: %s. "
+            "Review them and run 'python -m app.migrations remove-duplicates' to delete them",
+            len(duplicates), duplicates[:20]
+        )
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_transactions_transaction_hash ON transactions (transaction_hash)"))
+
+def _missing_hashes(db) -> Tuple[Dict[int, str], List[int]]:
+    """
+    Hashes of the transactions that have none. Returns ({id: hash} of the
+    ones that can be stored, ids of the ones that duplicate a transaction
+    already hashed or earlier in the table).
+    """
+    from .importer import calculate_hash
+
+    seen = set(db.execute(text("SELECT transaction_hash FROM transactions WHERE transaction_hash IS NOT NULL")).scalars())
+    hashes, duplicates = {}, []
+    rows = db.execute(text(
+        "SELECT id, date, amount, description, account_id FROM transactions WHERE transaction_hash IS NULL ORDER BY id"
+    ))
+    for tx_id, d, amount, description, account_id in rows:
+        tx_hash = calculate_hash(d, amount, description, account_id)
+        if tx_hash in seen:
+            duplicates.append(tx_id)
+        else:
+            seen.add(tx_hash)
+            hashes[tx_id] = tx_hash
+    return hashes, duplicates
+
+def remove_duplicate_transactions(db: Session) -> int:
+    """
+    Deletes the transactions step 3 left without a hash because they
+    duplicate another one, and hashes the rest. Only run on request, since
+    it deletes data. Does not commit. Returns the number of deleted transactions.
+    """
+    from . import rollups
+
+    hashes, duplicates = _missing_hashes(db)
+    if hashes:
+        db.execute(update(models.Transaction), [{"id": tx_id, "transaction_hash": tx_hash} for tx_id, tx_hash in hashes.items()])
+    if duplicates:
+        rollups.remove_transactions(db, duplicates)
+        db.execute(delete(models.transaction_labels).where(models.transaction_labels.c.transaction_id.in_(duplicates)))
+        db.execute(delete(models.Transaction).where(models.Transaction.id.in_(duplicates)))
+        logger.info("Removed %d duplicate transactions", len(duplicates))
+    return len(duplicates)
+
+@migration(4, "Create the transaction list and analytics indexes")
+def _transaction_indexes(conn):
+    conn.execute(text("DROP INDEX IF EXISTS ix_transactions_transfer_date_amount"))
+    for index in models.Transaction.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+    # Refresh planner statistics so SQLite can choose between the indexes
+    conn.execute(text("PRAGMA optimize"))
+
+@migration(5, "Build the monthly analytics rollup")
+def _monthly_rollup(conn):
+    from . import rollups
+
+    rollups.rebuild(conn)
+
+@migration(6, "Create the data_version table")
+def _data_version(conn):
+    models.DataVersion.__table__.create(bind=conn, checkfirst=True)
+
+LATEST_VERSION = len(MIGRATIONS)
+
+def schema_version(conn) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+def _set_schema_version(conn, version: int):
+    # PRAGMA values cannot be bound parameters
+    conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+def pending(conn) -> List[Migration]:
+    version = schema_version(conn)
+    if version == 0 and not _has_tables(conn):
+        return []
+    return [m for m in MIGRATIONS if m.version > version]
+
+def _has_tables(conn) -> bool:
+    return conn.execute(text("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table')")).scalar() == 1
+
+def upgrade(engine) -> List[int]:
+    """
+    Brings the database of `engine` to LATEST_VERSION. Returns the versions
+    of the steps that were applied.
+    """
+    applied = []
+    with engine.connect() as conn:
+        version = schema_version(conn)
+        if version > LATEST_VERSION:
+            logger.warning("Database schema version %d is newer than this application (%d)", version, LATEST_VERSION)
+            return applied
+        if version == 0 and not _has_tables(conn):
+            Base.metadata.create_all(bind=conn)
+            _set_schema_version(conn, LATEST_VERSION)
+            conn.commit()
+            logger.info("Created database schema version %d", LATEST_VERSION)
+            return applied
+
+        for step in MIGRATIONS[version:]:
+            logger.info("Migration %d - %s", step.version, step.description)
+            step.apply(conn)
+            _set_schema_version(conn, step.version)
+            conn.commit()
+            applied.append(step.version)
+    return applied
+
+def main(argv: Optional[Iterable[str]] = None):
+    from .config import get_db_path
+    from .database import _create_engine
+    from .logging_config import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Migrate a database to the current schema.")
+    parser.add_argument("command", choices=["status", "upgrade", "remove-duplicates"])
+    parser.add_argument("--db", help="path of the database file (default: the selected database)")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or get_db_path()
+    if not db_path:
+        parser.error("no database selected, pass --db")
+    engine = _create_engine(db_path)
+    try:
+        if args.command == "upgrade":
+            applied = upgrade(engine)
+            logger.info("Applied %d migrations", len(applied))
+        elif args.command == "remove-duplicates":
+            upgrade(engine)
+            with Session(bind=engine) as db:
+                remove_duplicate_transactions(db)
+                db.commit()
+        with engine.connect() as conn:
+            steps = pending(conn)
+            logger.info("%s: schema version %d of %d", db_path, schema_version(conn), LATEST_VERSION)
+            for step in steps:
+                logger.info("Pending migration %d - %s", step.version, step.description)
+        return 1 if steps else 0
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
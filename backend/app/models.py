@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, JSON, Table, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, JSON, Table, UniqueConstraint, Index, func, literal_column
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -7,7 +7,8 @@ transaction_labels = Table(
     "transaction_labels",
     Base.metadata,
     Column("transaction_id", Integer, ForeignKey("transactions.id"), primary_key=True),
-    Column("label_id", Integer, ForeignKey("labels.id"), primary_key=True)
+    Column("label_id", Integer, ForeignKey("labels.id"), primary_key=True),
+    Column("rule_id", Integer, ForeignKey("categorization_rules.id"), nullable=True, index=True) # Label rule that assigned the label
 )
 
 class Category(Base):
@@ -39,12 +40,50 @@ class Transaction(Base):
     to_account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
     transaction_hash = Column(String, unique=True, index=True, nullable=True)
     is_manual = Column(Integer, default=0) # 0 = Auto/Uncategorized, 1 = User set
+    matched_rule_id = Column(Integer, ForeignKey("categorization_rules.id"), nullable=True, index=True) # Rule that set the category/transfer
+
+    # Indexes for the transaction list and analytics queries; also created on
+    # existing databases by app.migrations
+    __table_args__ = (
+        Index("ix_transactions_account_date", "account_id", "date"),
+        Index("ix_transactions_category_date", "category_id", "date"),
+        # Covering index for the single-pass analytics sums over a date range (app/analytics.py)
+        Index("ix_transactions_date_amount", "date", "amount", "is_transfer", "category_id", "account_id"),
+        # Small partial index for the uncategorized filter and counter
+        Index("ix_transactions_uncategorized", "is_transfer", "date", "account_id", "category_id",
+              sqlite_where=category_id.is_(None)),
+    )
 
     category = relationship("Category", back_populates="transactions")
     account = relationship("Account", foreign_keys=[account_id], back_populates="transactions")
     to_account = relationship("Account", foreign_keys=[to_account_id])
     labels = relationship("Label", secondary=transaction_labels, back_populates="transactions")
 
+class MonthlyRollup(Base):
+    """
+    Per-month sums of transaction amounts, maintained incrementally by
+    app.rollups on every write so the analytics endpoints don't have to scan
+    the transactions table. sign is 1 for inflows, -1 for outflows, 0 for zero
+    amounts.
+    """
+    __tablename__ = "monthly_rollups"
+
+    id = Column(Integer, primary_key=True)
+    month = Column(String, nullable=True) # 'YYYY-MM'
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    is_transfer = Column(Integer, nullable=False, default=0)
+    sign = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+    # NULLs are distinct in a UNIQUE index, hence the ifnull() expressions;
+    # the upsert in app.rollups targets exactly these expressions
+    __table_args__ = (
+        Index("ux_monthly_rollups_key", func.ifnull(month, literal_column("''")), func.ifnull(account_id, literal_column("0")),
+              func.ifnull(category_id, literal_column("0")), is_transfer, sign, unique=True),
+    )
+
 class Account(Base):
     __tablename__ = "accounts"
 
@@ -73,6 +112,20 @@ class CSVProfile(Base):
     delimiter = Column(String, default=",")
     header_row = Column(Integer, default=0) # 0-indexed row for headers
 
+class RulesVersion(Base):
+    """Single row (id=1) counting changes to rules and labels, see categorization.rules_version."""
+    __tablename__ = "rules_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class DataVersion(Base):
+    """Single row (id=1) counting committed writes to the database, see cache.data_version."""
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 class CategorizationRule(Base):
     __tablename__ = "categorization_rules"
 
@@ -0,0 +1,250 @@
+"""
+Maintains the monthly_rollups table: transaction sums and counts per
+(month, account_id, category_id, is_transfer, sign), so the analytics
+endpoints read O(months x categories) rows instead of scanning transactions.
+
+ORM writes to transactions are tracked by a before_flush hook; bulk Core
+statements (CSV import, re-categorization, bulk delete) report their changes
+through `RollupDelta` themselves. `python -m app.rollups rebuild|check`
+recomputes the table from scratch or reports where it drifted.
+"""
+import argparse
+import calendar
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, event, func, insert, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ("month", "account_id", "category_id", "is_transfer", "sign")
+
+# Transaction attributes that determine a row's rollup key and total
+_TRACKED = ("date", "account_id", "category_id", "is_transfer", "amount")
+
+def rollup_key(tx_date, account_id, category_id, is_transfer, amount) -> tuple:
+    """The rollup key of a transaction, matching what `rebuild` computes in SQL."""
+    if tx_date is None:
+        month = None
+    elif isinstance(tx_date, str):
+        month = tx_date[:7]
+    else:
+        month = tx_date.strftime("%Y-%m")
+    amount = amount or 0.0
+    sign = 1 if amount > 0 else -1 if amount < 0 else 0
+    return (month, account_id, category_id, int(is_transfer or 0), sign)
+
+class RollupDelta:
+    """Accumulates transaction changes and applies them to the rollup in one upsert."""
+
+    def __init__(self):
+        self.totals: Dict[tuple, List] = defaultdict(lambda: [0.0, 0])
+
+    def __bool__(self):
+        return bool(self.totals)
+
+    def add(self, tx_date, account_id, category_id, is_transfer, amount, count: int = 1):
+        entry = self.totals[rollup_key(tx_date, account_id, category_id, is_transfer, amount)]
+        entry[0] += (amount or 0.0) * count
+        entry[1] += count
+
+    def remove(self, tx_date, account_id, category_id, is_transfer, amount):
+        self.add(tx_date, account_id, category_id, is_transfer, amount, count=-1)
+
+    def apply(self, db):
+        """Upserts the accumulated sums; rows whose count drops to zero are removed. Does not commit."""
+        rows = [
+            dict(zip(KEY_COLUMNS, key), total=total, count=count)
+            for key, (total, count) in self.totals.items()
+            if count or total
+        ]
+        self.totals.clear()
+        if not rows:
+            return
+        table = models.MonthlyRollup.__table__
+        stmt = sqlite_insert(table)
+        # The conflict target has to repeat the expressions of the unique index
+        key_index = next(i for i in table.indexes if i.name == "ux_monthly_rollups_key")
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_index.expressions),
+            set_={"total": table.c.total + stmt.excluded.total, "count": table.c.count + stmt.excluded.count},
+        )
+        db.execute(stmt, rows)
+        if any(r["count"] < 0 for r in rows):
+            db.execute(delete(table).where(table.c.count <= 0))
+
+def stored_keys(db, transaction_ids: Sequence[int], chunk_size: int = 500):
+    """Yields (id, date, account_id, category_id, is_transfer, amount) as currently stored."""
+    t = models.Transaction
+    for start in range(0, len(transaction_ids), chunk_size):
+        yield from db.execute(
+            select(t.id, t.date, t.account_id, t.category_id, t.is_transfer, t.amount)
+            .where(t.id.in_(transaction_ids[start:start + chunk_size]))
+        )
+
+def remove_transactions(db, transaction_ids: Sequence[int]):
+    """Subtracts transactions that are about to be deleted with a bulk statement."""
+    delta = RollupDelta()
+    for row in stored_keys(db, list(transaction_ids)):
+        delta.remove(*row[1:])
+    delta.apply(db)
+
+@event.listens_for(Session, "before_flush")
+def _track_orm_changes(session, flush_context, instances):
+    added = []
+    changed = {}
+    for obj in session.new:
+        if isinstance(obj, models.Transaction):
+            added.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, models.Transaction) and obj not in session.deleted:
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in _TRACKED):
+                changed[obj.id] = obj
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, models.Transaction)]
+    if not (added or changed or deleted):
+        return
+
+    delta = RollupDelta()
+    with session.no_autoflush:
+        # The database still holds the old values at this point, even for
+        # attributes that were expired before being modified
+        for row in stored_keys(session, list(changed) + deleted):
+            delta.remove(*row[1:])
+        for obj in added + list(changed.values()):
+            delta.add(*(getattr(obj, name) for name in _TRACKED))
+    delta.apply(session)
+
+def _month(value: date) -> str:
+    return value.strftime("%Y-%m")
+
+def _shift_month(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _month_end(value: date) -> date:
+    return value.replace(day=calendar.monthrange(value.year, value.month)[1])
+
+def split_date_range(start_date: Optional[str], end_date: Optional[str]):
+    """
+    Splits an inclusive date range into whole months, answered by the rollup,
+    and partial months at its edges, answered by the transactions table.
+    Returns (months, edges): months is a (first, last) 'YYYY-MM' pair where
+    None leaves that end open, or None if no month is fully covered; edges is
+    a list of inclusive (start, end) dates. Returns None if a bound is not an
+    ISO date, in which case everything has to come from transactions.
+    """
+    try:
+        start = date.fromisoformat(start_date) if start_date else None
+        end = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        return None
+
+    if start and end:
+        if start > end:
+            return None, []
+        if (start.year, start.month) == (end.year, end.month):
+            if start.day == 1 and end == _month_end(end):
+                return (_month(start), _month(end)), []
+            return None, [(start, end)]
+
+    edges = []
+    first = last = None
+    if start:
+        if start.day == 1:
+            first = _month(start)
+        else:
+            edges.append((start, _month_end(start)))
+            first = _month(_shift_month(start, 1))
+    if end:
+        if end == _month_end(end):
+            last = _month(end)
+        else:
+            edges.append((end.replace(day=1), end))
+            last = _month(_shift_month(end, -1))
+    if first and last and first > last:
+        return None, edges
+    return (first, last), edges
+
+def _transaction_expressions():
+    t = models.Transaction
+    return {
+        "month": func.strftime("%Y-%m", t.date),
+        "account_id": t.account_id,
+        "category_id": t.category_id,
+        "is_transfer": func.ifnull(t.is_transfer, 0),
+        "sign": case((t.amount > 0, 1), (t.amount < 0, -1), else_=0),
+    }
+
+def _fresh_totals(db) -> Dict[tuple, Tuple[float, int]]:
+    tx_expr = _transaction_expressions()
+    t = models.Transaction
+    columns = [tx_expr[k] for k in KEY_COLUMNS]
+    query = select(*columns, func.ifnull(func.sum(t.amount), 0.0), func.count()).group_by(*columns)
+    return {tuple(row[:5]): (row[5], row[6]) for row in db.execute(query)}
+
+def rebuild(db) -> int:
+    """Recomputes the whole rollup from transactions. Does not commit. Returns the number of rollup rows."""
+    t = models.Transaction
+    table = models.MonthlyRollup.__table__
+    tx_expr = _transaction_expressions()
+    columns = [tx_expr[k] for k in KEY_COLUMNS]
+    db.execute(delete(table))
+    db.execute(insert(table).from_select(
+        list(KEY_COLUMNS) + ["total", "count"],
+        select(*columns, func.ifnull(func.sum(t.amount), 0.0), func.count()).group_by(*columns),
+    ))
+    return db.execute(select(func.count()).select_from(table)).scalar()
+
+def check(db, tolerance: float = 1e-6) -> List[dict]:
+    """Compares the rollup against a fresh aggregation and returns the keys that differ."""
+    r = models.MonthlyRollup
+    stored = {
+        tuple(row[:5]): (row[5], row[6])
+        for row in db.execute(select(*(getattr(r, k) for k in KEY_COLUMNS), r.total, r.count))
+    }
+    fresh = _fresh_totals(db)
+    mismatches = []
+    for key in sorted(set(stored) | set(fresh), key=repr):
+        stored_total, stored_count = stored.get(key, (0.0, 0))
+        fresh_total, fresh_count = fresh.get(key, (0.0, 0))
+        if stored_count != fresh_count or abs(stored_total - fresh_total) > tolerance * max(1.0, abs(fresh_total)):
+            mismatches.append(dict(
+                zip(KEY_COLUMNS, key),
+                stored=(stored_total, stored_count),
+                expected=(fresh_total, fresh_count),
+            ))
+    return mismatches
+
+def main(argv: Optional[Iterable[str]] = None):
+    from .database import SessionLocal
+    from .logging_config import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(prog="python -m app.rollups", description="Maintain the analytics rollup table.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        models.MonthlyRollup.__table__.create(bind=db.get_bind(), checkfirst=True)
+        mismatches = check(db)
+        for m in mismatches:
+            logger.warning("Rollup mismatch: %s", m)
+        logger.info("Rollup check: %d mismatching keys", len(mismatches))
+        if args.command == "rebuild":
+            rows = rebuild(db)
+            db.commit()
+            logger.info("Rollup rebuilt: %d rows", rows)
+        return 1 if mismatches and args.command == "check" else 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+import datetime
 from datetime import date
 from typing import List, Optional, Dict, Any
 
@@ -54,13 +55,21 @@ class TransactionCreate(TransactionBase):
     pass
 
 class Transaction(TransactionBase):
+    # Stored transactions may lack a date
+    date: Optional[datetime.date] = None
     id: int
+    matched_rule_id: Optional[int] = None
     category: Optional[Category] = None
     to_account: Optional[Account] = None
     labels: List[Label] = []
     class Config:
         from_attributes = True
 
+class TransactionPage(BaseModel):
+    items: List[Transaction]
+    # Opaque cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
+
 class TransactionUpdate(BaseModel):
     category_id: Optional[int] = None
     is_transfer: Optional[bool] = None
@@ -1,13 +1,17 @@
+import logging
+
 from sqlalchemy.orm import Session
 from . import models
 
+logger = logging.getLogger(__name__)
+
 def seed_db(db: Session):
     # 1. Accounts
     if db.query(models.Account).count() == 0:
         checking = models.Account(name="Main Checking Account", type="Checking")
         credit = models.Account(name="Travel Credit Card", type="Credit Card")
         db.add_all([checking, credit])
-        print("Accounts seeded.")
+        logger.info("Accounts seeded.")
 
     # 2. Categories
     if db.query(models.Category).count() == 0:
@@ -25,7 +29,7 @@ def seed_db(db: Session):
         restaurants = models.Category(name="Restaurants", parent_id=food.id)
         fuel = models.Category(name="Fuel", parent_id=transport.id)
         db.add_all([groceries, restaurants, fuel])
-        print("Categories seeded.")
+        logger.info("Categories seeded.")
 
     # 3. Categorization Rules
     if db.query(models.CategorizationRule).count() == 0:
@@ -49,6 +53,6 @@ def seed_db(db: Session):
                 rule.target_category_id = shopping_cat.id
         
         db.add_all(rules)
-        print("Rules seeded.")
+        logger.info("Rules seeded.")
 
     db.commit()
@@ -1,10 +1,13 @@
 import re
-import pandas as pd
-from typing import Dict, List, Optional, Any, Union
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
+from typing import TYPE_CHECKING, Dict, List, Optional, Any, Union
+
+from .matcher import MultiPatternMatcher
+
+# pandas, numpy and scikit-learn are imported on first use, so that starting
+# the API does not pay for them (see tests/test_startup.py)
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.pipeline import Pipeline
 
 class TransactionCategorizer:
     def __init__(self):
@@ -13,29 +16,46 @@ class TransactionCategorizer:
         
         # Layer 2: Heuristic (Regex Patterns)
         self.regex_patterns: List[Dict[str, Any]] = []
+        self._matcher: Optional[MultiPatternMatcher] = None
         
         # Layer 3: Probabilistic (ML Pipeline)
-        self.ml_pipeline: Optional[Pipeline] = None
+        self.ml_pipeline: Optional["Pipeline"] = None
         self.is_trained = False
 
     def add_exact_match(self, description: str, category: str):
         """Add an exact string match rule."""
         self.exact_matches[description.strip().lower()] = category
 
-    def add_regex_pattern(self, pattern: str, category: str):
-        """Add a regex pattern match rule."""
+    def add_regex_pattern(self, pattern: str, category: str, rule_id: Optional[int] = None):
+        """Add a regex pattern match rule. `rule_id` is reported back as match provenance."""
         self.regex_patterns.append({
             "pattern": re.compile(pattern, re.IGNORECASE),
             "category": category,
-            "raw_pattern": pattern
+            "raw_pattern": pattern,
+            "rule_id": rule_id
         })
-
-    def train(self, data: Union[str, pd.DataFrame]):
+        # The compiled matcher is rebuilt lazily on the next lookup
+        self._matcher = None
+
+    def _get_matcher(self) -> MultiPatternMatcher:
+        if self._matcher is None:
+            self._matcher = MultiPatternMatcher(
+                [entry["pattern"] for entry in self.regex_patterns],
+                [entry["category"].startswith("__ID_LABEL__:") for entry in self.regex_patterns]
+            )
+        return self._matcher
+
+    def train(self, data: Union[str, "pd.DataFrame"]):
         """
         Train the probabilistic layer. 
         Accepts a path to a CSV or a pandas DataFrame.
         Expected columns: 'description', 'category'
         """
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.naive_bayes import MultinomialNB
+        from sklearn.pipeline import Pipeline
+
         if isinstance(data, str):
             df = pd.read_csv(data)
         else:
@@ -80,20 +100,20 @@ class TransactionCategorizer:
             }
 
         # Layer 2: Heuristic (Regex)
-        for entry in self.regex_patterns:
-            # Skip label rules in the main categorization waterfall
-            if entry["category"].startswith("__ID_LABEL__:"):
-                continue
-                
-            if entry["pattern"].search(description):
-                return {
-                    "category": entry["category"],
-                    "source": "regex",
-                    "confidence": 0.9
-                }
+        # Label rules are skipped by the matcher in the main categorization waterfall
+        category_idx, _ = self._get_matcher().match(description, with_labels=False)
+        if category_idx is not None:
+            return {
+                "category": self.regex_patterns[category_idx]["category"],
+                "source": "regex",
+                "confidence": 0.9,
+                "rule_id": self.regex_patterns[category_idx]["rule_id"]
+            }
 
         # Layer 3: Probabilistic (ML)
         if self.is_trained and self.ml_pipeline:
+            import numpy as np
+
             # Predict
             probs = self.ml_pipeline.predict_proba([description])[0]
             max_prob_idx = np.argmax(probs)
@@ -122,11 +142,83 @@ class TransactionCategorizer:
         if not description:
             return []
             
+        _, label_indices = self._get_matcher().match(description, with_category=False)
+        return self._label_matches(label_indices)[0]
+
+    def _label_matches(self, label_indices: List[int]):
+        """Returns the distinct matched labels and, aligned with them, the first rule id that matched each."""
         matched_labels = []
-        for entry in self.regex_patterns:
-            if entry["category"].startswith("__ID_LABEL__:") and entry["pattern"].search(description):
-                label_info = entry["category"].replace("__ID_LABEL__:", "")
-                if label_info not in matched_labels:
-                    matched_labels.append(label_info)
-        
-        return matched_labels
+        rule_ids = []
+        for idx in label_indices:
+            label_info = self.regex_patterns[idx]["category"].replace("__ID_LABEL__:", "")
+            if label_info not in matched_labels:
+                matched_labels.append(label_info)
+                rule_ids.append(self.regex_patterns[idx]["rule_id"])
+        return matched_labels, rule_ids
+
+    def categorize_many(self, descriptions: Union[List[str], "pd.Series"]) -> "pd.DataFrame":
+        """
+        Batch version of `categorize` + `get_labels`.
+        Returns a DataFrame (aligned with the input index) with the columns
+        'category', 'source', 'confidence', 'labels', 'rule_id' (the category
+        rule that matched) and 'label_rule_ids' (aligned with 'labels').
+
+        Each distinct description is matched once. The ML layer is invoked a
+        single time for all descriptions left unresolved by the rule layers.
+        """
+        import numpy as np
+        import pandas as pd
+
+        series = descriptions if isinstance(descriptions, pd.Series) else pd.Series(list(descriptions), dtype=object)
+        series = series.where(series.notna(), "").astype(str)
+
+        codes, unique = pd.factorize(series)
+        results: List[Dict[str, Any]] = []
+        unresolved: List[int] = []
+        matcher = self._get_matcher()
+
+        for pos, description in enumerate(unique):
+            if not description:
+                results.append({"category": "Uncategorized", "source": "none", "confidence": 0.0, "labels": [], "rule_id": None, "label_rule_ids": []})
+                continue
+
+            category_idx, label_indices = matcher.match(description)
+            labels, label_rule_ids = self._label_matches(label_indices)
+            result = {"labels": labels, "label_rule_ids": label_rule_ids, "rule_id": None}
+
+            exact = self.exact_matches.get(description.strip().lower())
+            if exact is not None:
+                result.update(category=exact, source="exact", confidence=1.0)
+            elif category_idx is not None:
+                entry = self.regex_patterns[category_idx]
+                result.update(category=entry["category"], source="regex", confidence=0.9, rule_id=entry["rule_id"])
+            else:
+                result.update(category="Uncategorized", source="none", confidence=0.0)
+                unresolved.append(pos)
+            results.append(result)
+
+        # Layer 3: Probabilistic (ML), one call for the whole unresolved subset
+        if unresolved and self.is_trained and self.ml_pipeline:
+            probs = self.ml_pipeline.predict_proba([unique[pos] for pos in unresolved])
+            max_prob_idx = np.argmax(probs, axis=1)
+            confidences = probs[np.arange(len(unresolved)), max_prob_idx]
+            for pos, class_idx, confidence in zip(unresolved, max_prob_idx, confidences):
+                if confidence > 0.7:
+                    results[pos].update(
+                        category=str(self.ml_pipeline.classes_[class_idx]),
+                        source="ml",
+                        confidence=float(confidence)
+                    )
+
+        # Expand the per-description results back onto every row.
+        # object dtype keeps rule ids as ints (or None) instead of NaN-padded floats
+        columns = ["category", "source", "confidence", "labels", "rule_id", "label_rule_ids"]
+        data = {}
+        for column in columns:
+            values = np.empty(len(results), dtype=object)
+            for pos, result in enumerate(results):
+                values[pos] = result[column]
+            data[column] = values[codes] if len(codes) else values[:0]
+        df = pd.DataFrame(data, index=series.index)
+        df["confidence"] = df["confidence"].astype(float)
+        return df
@@ -0,0 +1,175 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Characters that re.IGNORECASE matches against an ASCII letter but whose
+# str.lower() does not yield that letter (e.g. LATIN SMALL LETTER LONG S
+# matches "s"). Folding them first keeps the literal prefilter free of
+# false negatives.
+_FOLD_TABLE = {0x130: "i", 0x131: "i", 0x17F: "s"}
+
+_MIN_LITERAL_LENGTH = 2
+
+
+def fold(text: str) -> str:
+    """Case-fold a description the same way required literals are folded."""
+    if text.isascii():
+        return text.lower()
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def _literal_runs(parsed, runs: List[str]):
+    """
+    Collect contiguous runs of literal characters that every match of the
+    parsed (sub)pattern must contain. Anything optional or ambiguous simply
+    ends the current run, so the result is conservative.
+    """
+    current: List[str] = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, av in parsed:
+        if op is sre_constants.LITERAL and av < 128:
+            current.append(chr(av).lower())
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            _literal_runs(av[-1], runs)
+        elif op is sre_constants.ATOMIC_GROUP:
+            _literal_runs(av, runs)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) or op is getattr(sre_constants, "POSSESSIVE_REPEAT", None):
+            min_count, _, item = av
+            if min_count >= 1:
+                _literal_runs(item, runs)
+    flush()
+
+
+def required_literal(pattern: str, flags: int = 0) -> Optional[str]:
+    """
+    Returns the longest folded literal substring that any text matching
+    `pattern` must contain, or None if no useful literal can be derived.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+    runs: List[str] = []
+    _literal_runs(parsed, runs)
+    if not runs:
+        return None
+    best = max(runs, key=len)
+    return best if len(best) >= _MIN_LITERAL_LENGTH else None
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton reporting which keywords occur in a text."""
+
+    def __init__(self, keywords: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Set[str]] = [set()]
+        for word in keywords:
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(set())
+                node = nxt
+            self._out[node].add(word)
+
+        # Breadth-first construction of failure links
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        node = 0
+        for ch in text:
+            nxt = goto[node].get(ch)
+            while nxt is None and node:
+                node = fail[node]
+                nxt = goto[node].get(ch)
+            # Transitions never lead back to the root, so None means "restart"
+            node = nxt or 0
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+class MultiPatternMatcher:
+    """
+    Evaluates an ordered list of compiled regexes in a single pass per text.
+
+    Every pattern is reduced to a required literal (where one exists). One
+    Aho-Corasick scan over the folded text yields the candidate patterns, and
+    only those are confirmed with the real regex. Patterns without a usable
+    literal are always candidates. The order of `patterns` is the priority
+    order: `match` returns the first matching category pattern and every
+    matching label pattern.
+    """
+
+    def __init__(self, patterns: List[re.Pattern], is_label: List[bool]):
+        self.patterns = patterns
+        self._category_always: List[int] = []
+        self._label_always: List[int] = []
+        self._by_literal: Dict[str, List[int]] = {}
+
+        for idx, compiled in enumerate(patterns):
+            literal = required_literal(compiled.pattern, compiled.flags)
+            if literal is None:
+                (self._label_always if is_label[idx] else self._category_always).append(idx)
+            else:
+                self._by_literal.setdefault(literal, []).append(idx)
+
+        self._is_label = is_label
+        self._automaton = AhoCorasick(list(self._by_literal)) if self._by_literal else None
+
+    def candidates(self, text: str) -> Tuple[List[int], List[int]]:
+        """Returns (category candidates, label candidates) in priority order."""
+        categories = list(self._category_always)
+        labels = list(self._label_always)
+        if self._automaton is not None:
+            for literal in self._automaton.find(fold(text)):
+                for idx in self._by_literal[literal]:
+                    (labels if self._is_label[idx] else categories).append(idx)
+        categories.sort()
+        labels.sort()
+        return categories, labels
+
+    def match(self, text: str, with_category: bool = True, with_labels: bool = True) -> Tuple[Optional[int], List[int]]:
+        """
+        Returns the index of the highest-priority matching category pattern
+        (or None) and the indices of all matching label patterns.
+        """
+        if not text:
+            return None, []
+        categories, labels = self.candidates(text)
+        category_idx = None
+        if with_category:
+            for idx in categories:
+                if self.patterns[idx].search(text):
+                    category_idx = idx
+                    break
+        matched_labels = []
+        if with_labels:
+            matched_labels = [idx for idx in labels if self.patterns[idx].search(text)]
+        return category_idx, matched_labels
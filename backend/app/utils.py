@@ -1,7 +1,59 @@
 import pandas as pd
+import numpy as np
 import io
-from typing import Dict, Any, List
-from datetime import datetime
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, BinaryIO, Iterator
+
+class ImportSummary:
+    """
+    Aggregated diagnostics of one CSV import: row counts, failed rows grouped
+    by reason and the time spent in each phase.
+    """
+
+    def __init__(self):
+        self.rows_total = 0
+        self.rows_parsed = 0
+        self.chunks = 0
+        self.failures: Counter = Counter()
+        self.timings: Dict[str, float] = {}
+        self.progress: List[Dict[str, Any]] = []
+
+    def fail(self, reason: str, count: int = 1):
+        if count:
+            self.failures[reason] += count
+
+    def checkpoint(self, imported: int, bytes_read: Optional[int] = None, bytes_total: Optional[int] = None):
+        """Records how far the import got after a chunk."""
+        self.progress.append({
+            "chunk": self.chunks,
+            "rows_read": self.rows_total,
+            "imported": imported,
+            "bytes_read": bytes_read,
+            "bytes_total": bytes_total,
+        })
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows_total": self.rows_total,
+            "rows_parsed": self.rows_parsed,
+            "rows_failed": sum(self.failures.values()),
+            "chunks": self.chunks,
+            "failures": dict(self.failures.most_common()),
+            "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in self.timings.items()},
+            "progress": self.progress,
+        }
 
 def clean_amount(val: Any) -> float:
     if pd.isna(val) or val == '':
@@ -11,7 +63,10 @@ def clean_amount(val: Any) -> float:
     # Remove currency symbols and common non-numeric chars (except dot, comma, minus, plus)
     # Using a whitelist approach for characters to keep
     s = "".join(c for c in s if c.isdigit() or c in '.,-()+')
-    
+    return _amount_from_text(s)
+
+def _amount_from_text(s: str) -> float:
+    """Separator heuristics of `clean_amount`, for a string with the junk already removed."""
     if not s: return 0.0
 
     # Handle parentheses for negative numbers: (100.00) -> -100.00
@@ -57,14 +112,161 @@ def clean_amount(val: Any) -> float:
         except:
             return 0.0
 
-def parse_csv_with_profile(content: bytes, profile: Dict[str, Any]) -> List[Dict[str, Any]]:
-    df = pd.read_csv(
-        io.BytesIO(content), 
+_AMOUNT_JUNK = re.compile(r"[^0-9.,\-()+]")
+_PLAIN_AMOUNT = re.compile(r"[+-]?[0-9]+(?:\.[0-9]+)?")
+
+def _clean_amount_text(value: Any) -> float:
+    """`clean_amount` of a present cell."""
+    s = value if isinstance(value, str) else str(value)
+    if _PLAIN_AMOUNT.fullmatch(s):
+        return float(s)
+    # A regex is much faster than the character filter, but [0-9] only matches ASCII digits
+    if not s.isascii():
+        return clean_amount(s)
+    return _amount_from_text(_AMOUNT_JUNK.sub("", s))
+
+def clean_amount_series(values: pd.Series) -> pd.Series:
+    """`clean_amount` over a whole column, computed once per distinct value."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numbers = values.astype(float)
+        # Numbers whose str() has no exponent (and isn't inf) come out of clean_amount unchanged
+        plain = (numbers == 0) | ((numbers.abs() >= 1e-4) & (numbers.abs() < 1e16))
+        if plain.all():
+            return numbers
+        result = numbers.where(plain, 0.0)
+        other = ~plain & numbers.notna()
+        result[other] = clean_amount_series(values[other].astype(object))
+        return result
+    return _map_distinct(values, _clean_amount_text, 0.0).astype(float)
+
+def _map_distinct(values: pd.Series, func, missing: Any = np.nan) -> pd.Series:
+    """
+    `func` of every cell, `missing` where the cell is missing. Bank exports
+    repeat dates, amounts, types and texts a lot, so `func` runs once per
+    distinct value and the results are mapped back.
+    """
+    codes, uniques = pd.factorize(values)
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    mapped[:-1] = [func(value) for value in np.asarray(uniques, dtype=object).tolist()]
+    # Missing cells have code -1
+    mapped[-1] = missing
+    return pd.Series(mapped[codes], index=values.index, dtype=object)
+
+def _indicator_list(value: Any, default: List[str]) -> List[str]:
+    # Indicators might be comma-separated strings from frontend
+    if value is None:
+        value = default
+    if isinstance(value, str):
+        return [s.strip().upper() for s in value.split(',')]
+    return [str(s).upper() for s in value]
+
+def _stripped_text(values: pd.Series, missing: Any = np.nan) -> pd.Series:
+    """str() of every value without surrounding whitespace, `missing` where the cell is missing."""
+    return _map_distinct(values, lambda value: str(value).strip(), missing)
+
+def _parse_dates(raw: pd.Series, date_format: str) -> pd.Series:
+    """
+    Parses each distinct date string once: flexible parsing first, then the
+    profile's `date_format` for the values the flexible parser rejects.
+    Unparseable values become NaT.
+    """
+    codes, uniques = pd.factorize(raw)
+    uniques = pd.Index(uniques, dtype=object)
+    try:
+        parsed = pd.Series(pd.to_datetime(uniques, format='mixed', errors='coerce'))
+    except (ValueError, TypeError):
+        # e.g. mixed timezone offsets: fall back to parsing value by value
+        parsed = pd.Series([pd.to_datetime(v, errors='coerce') for v in uniques], dtype=object)
+    dates = pd.Series([None if pd.isna(v) else v.date() for v in parsed], dtype=object)
+
+    missing = dates.isna()
+    if missing.any():
+        fallback = pd.to_datetime(pd.Series(uniques[missing.to_numpy()]), format=date_format, errors='coerce')
+        dates[missing] = [None if pd.isna(v) else v.date() for v in fallback]
+
+    return pd.Series(dates.to_numpy()[codes], index=raw.index, dtype=object)
+
+@lru_cache(maxsize=None)
+def _record_builder(width: int):
+    """
+    A function (columns, *keys) -> [{key: value, ...} per row] for `width`
+    columns. A dict display in a comprehension builds the rows about twice
+    as fast as dict(zip(keys, row)); the keys are arguments, so no column
+    name ends up in the generated source.
+    """
+    keys = [f"k{i}" for i in range(width)]
+    values = [f"v{i}" for i in range(width)]
+    pairs = ", ".join(f"{k}: {v}" for k, v in zip(keys, values))
+    source = f"lambda columns, {', '.join(keys)}: [{{{pairs}}} for {', '.join(values)}, in zip(*columns)]"
+    return eval(source, {})
+
+def _raw_rows(df: pd.DataFrame, keep: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    The cells of the rows in `keep` as {column: value} dicts of Python
+    objects, with the values iterating over `df.values` used to give.
+    """
+    names = list(df.columns)
+    if not names:
+        return [{} for _ in range(int(keep.sum()))]
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+        # Numeric-only frames are upcast to a common type by df.values
+        columns = df.values[keep].astype(object).T.tolist()
+    else:
+        columns = [df.iloc[:, i].to_numpy(dtype=object)[keep].tolist() for i in range(len(names))]
+    return _record_builder(len(names))(columns, *names)
+
+def _read_csv(source, profile: Dict[str, Any], **kwargs):
+    return pd.read_csv(
+        source,
         delimiter=profile.get('delimiter', ','),
         skiprows=profile.get('header_row', 0),
-        encoding='utf-8-sig'
+        encoding='utf-8-sig',
+        **kwargs
     )
-    
+
+def _whole_file_dtype(dtypes: set):
+    """The dtype pandas infers for a whole column, given the dtypes it inferred for each chunk of it."""
+    if len(dtypes) == 1:
+        return next(iter(dtypes))
+    if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+        return np.result_type(*dtypes)
+    return str
+
+def parse_csv_with_profile(content: bytes, profile: Dict[str, Any], summary: Optional[ImportSummary] = None) -> List[Dict[str, Any]]:
+    """
+    Parses a bank CSV according to a profile. Rows that cannot be parsed are
+    skipped; pass an `ImportSummary` to get counts and reasons for them.
+    """
+    summary = summary if summary is not None else ImportSummary()
+    return _parse_frame(_read_csv(io.BytesIO(content), profile), profile, summary)
+
+def iter_csv_with_profile(source: BinaryIO, profile: Dict[str, Any], summary: Optional[ImportSummary] = None,
+                          chunksize: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Streaming variant of `parse_csv_with_profile`: reads `source` (a seekable
+    binary file object) `chunksize` rows at a time and yields the parsed rows
+    of each chunk, so memory stays bounded regardless of the file size.
+
+    The column types pandas infers depend on the whole column (e.g. a gap
+    turns integers into floats), so a first pass collects them and every
+    chunk is then read with the types of the whole file. This keeps the rows,
+    and the hashes of the transactions, the same as `parse_csv_with_profile`.
+    """
+    summary = summary if summary is not None else ImportSummary()
+    start = source.tell()
+    dtypes: Dict[str, set] = {}
+    with _read_csv(source, profile, chunksize=chunksize) as reader:
+        for df in reader:
+            for name, dtype in df.dtypes.items():
+                dtypes.setdefault(name, set()).add(dtype)
+    source.seek(start)
+
+    dtype = {name: _whole_file_dtype(chunk_dtypes) for name, chunk_dtypes in dtypes.items()}
+    with _read_csv(source, profile, chunksize=chunksize, dtype=dtype) as reader:
+        for df in reader:
+            yield _parse_frame(df, profile, summary)
+
+def _parse_frame(df: pd.DataFrame, profile: Dict[str, Any], summary: ImportSummary) -> List[Dict[str, Any]]:
     mapping = profile['column_mapping']
     date_col = mapping.get('date')
     amount_col = mapping.get('amount')
@@ -80,90 +282,92 @@ def parse_csv_with_profile(content: bytes, profile: Dict[str, Any]) -> List[Dict
         desc_cols = [desc_cols]
     
     date_format = profile.get('date_format', '%Y-%m-%d')
+
+    summary.rows_total += len(df)
+    if date_col not in df.columns:
+        summary.fail(f"date column '{date_col}' not found", len(df))
+        return []
+    if desc_cols is None:
+        summary.fail("no description column mapped", len(df))
+        return []
+    # Work positionally; malformed files can give pandas a non-unique index
+    df = df.reset_index(drop=True)
+
+    # 1. Parse Date (rows without a parseable date are skipped)
+    date_text = _stripped_text(df[date_col])
+    dates = pd.Series([None] * len(df), index=df.index, dtype=object)
+    has_date = date_text.notna()
+    dates[has_date] = _parse_dates(date_text[has_date], date_format)
+    keep = dates.notna()
+    summary.fail("missing date", int((~has_date).sum()))
+    summary.fail("unparseable date", int((has_date & ~keep).sum()))
     
-    transactions = []
-    for i, row in df.iterrows():
-        try:
-            # 1. Parse Date
-            if date_col not in row or pd.isna(row[date_col]):
-                continue
-            raw_date = str(row[date_col]).strip()
-            # Try flexible parsing first, then fallback to explicit format
-            try:
-                dt = pd.to_datetime(raw_date).date()
-            except:
-                dt = datetime.strptime(raw_date, date_format).date()
-            
-            # 2. Parse Amount
-            amount = 0.0
-            if amount_col and amount_col in row:
-                raw_val = row[amount_col]
-                amount = clean_amount(raw_val)
-                print(f"DEBUG: Row {i}, Col '{amount_col}', Raw='{raw_val}', Cleaned={amount}")
-                
-                # Handle indicator column if present
-                if amount_type_col and amount_type_col in row:
-                    indicator = str(row[amount_type_col]).upper().strip()
-                    
-                    # Indicators might be comma-separated strings from frontend
-                    credit_indicators = mapping.get('credit_indicators', ['C', 'CR', 'CREDIT'])
-                    if isinstance(credit_indicators, str):
-                        credit_indicators = [s.strip().upper() for s in credit_indicators.split(',')]
-                    else:
-                        credit_indicators = [str(s).upper() for s in credit_indicators]
-                        
-                    debit_indicators = mapping.get('debit_indicators', ['D', 'DR', 'DEBIT'])
-                    if isinstance(debit_indicators, str):
-                        debit_indicators = [s.strip().upper() for s in debit_indicators.split(',')]
-                    else:
-                        debit_indicators = [str(s).upper() for s in debit_indicators]
-                    
-                    if indicator in debit_indicators:
-                        amount = -abs(amount)
-                    elif indicator in credit_indicators:
-                        amount = abs(amount)
-                    print(f"DEBUG: Row {i}, Indicator Column '{amount_type_col}', Key='{indicator}', Final Amount={amount}")
-                
-                if invert_amount:
-                    amount = -amount
-                    print(f"DEBUG: Row {i}, Invert Amount active, Final Amount={amount}")
-                    
-            elif credit_col or debit_col:
-                credit_val = 0.0
-                debit_val = 0.0
-                if credit_col and credit_col in row and not pd.isna(row[credit_col]):
-                    credit_val = abs(clean_amount(row[credit_col]))
-                if debit_col and debit_col in row and not pd.isna(row[debit_col]):
-                    debit_val = abs(clean_amount(row[debit_col]))
-                
-                amount = credit_val - debit_val
-                
-                if invert_amount:
-                    amount = -amount
-                    
-                print(f"DEBUG: Row {i}, Dual Amount (Credit={row.get(credit_col)}, Debit={row.get(debit_col)}), Final={amount}")
-            
-            # 3. Parse Description (Combine multiple fields)
-            desc_parts = []
-            for col in desc_cols:
-                if col in row and not pd.isna(row[col]):
-                    desc_parts.append(str(row[col]).strip())
-            description = " | ".join(desc_parts)
-            
-            # 4. Parse Account String (if mapped)
-            account_string = None
-            if account_col and account_col in row and not pd.isna(row[account_col]):
-                account_string = str(row[account_col]).strip()
-            
-            transactions.append({
-                "date": dt,
-                "amount": amount,
-                "description": description,
-                "account_string": account_string,
-                "raw_data": row.to_dict()
-            })
-        except Exception as e:
-            print(f"DEBUG: Error parsing row {i}: {e}")
+    # 2. Parse Amount
+    amounts = pd.Series(0.0, index=df.index)
+    if amount_col and amount_col in df.columns:
+        amounts = clean_amount_series(df[amount_col])
+
+        # Handle indicator column if present
+        if amount_type_col and amount_type_col in df.columns:
+            indicator = _map_distinct(df[amount_type_col], lambda value: str(value).upper().strip(), 'NAN')
+            credit_indicators = _indicator_list(mapping.get('credit_indicators'), ['C', 'CR', 'CREDIT'])
+            debit_indicators = _indicator_list(mapping.get('debit_indicators'), ['D', 'DR', 'DEBIT'])
+
+            is_debit = indicator.isin(debit_indicators)
+            is_credit = indicator.isin(credit_indicators) & ~is_debit
+            amounts = amounts.where(~is_debit, -amounts.abs())
+            amounts = amounts.where(~is_credit, amounts.abs())
+
+        if invert_amount:
+            amounts = -amounts
+
+    elif credit_col or debit_col:
+        credit_vals = pd.Series(0.0, index=df.index)
+        debit_vals = pd.Series(0.0, index=df.index)
+        if credit_col and credit_col in df.columns:
+            credit_vals = clean_amount_series(df[credit_col]).abs()
+        if debit_col and debit_col in df.columns:
+            debit_vals = clean_amount_series(df[debit_col]).abs()
+
+        amounts = credit_vals - debit_vals
+
+        if invert_amount:
+            amounts = -amounts
+    
+    # 3. Parse Description (Combine multiple fields, skipping missing cells)
+    descriptions = None
+    for col in desc_cols:
+        if col not in df.columns:
             continue
-            
-    return transactions
+        parts = _stripped_text(df[col], None).tolist()
+        if descriptions is None:
+            descriptions = parts
+        else:
+            descriptions = [d if p is None else p if d is None else f"{d} | {p}" for d, p in zip(descriptions, parts)]
+    if descriptions is None:
+        descriptions = [""] * len(df)
+    elif None in descriptions:
+        descriptions = ["" if d is None else d for d in descriptions]
+    
+    # 4. Parse Account String (if mapped)
+    account_strings = pd.Series([None] * len(df), index=df.index, dtype=object)
+    if account_col and account_col in df.columns:
+        account_strings = _stripped_text(df[account_col], None)
+
+    keep = keep.to_numpy()
+    raw_rows = _raw_rows(df, keep)
+    summary.rows_parsed += len(raw_rows)
+
+    return [
+        {
+            "date": dt,
+            "amount": amount,
+            "description": description,
+            "account_string": account_string,
+            "raw_data": raw_data
+        }
+        for dt, amount, description, account_string, raw_data in zip(
+            dates[keep].tolist(), amounts[keep].tolist(), np.asarray(descriptions, dtype=object)[keep].tolist(),
+            account_strings[keep].tolist(), raw_rows
+        )
+    ]
@@ -0,0 +1,55 @@
+"""
+Measures how long `parse_csv_with_profile` takes for a synthetic bank export
+with an indicator column and two description columns.
+
+    cd backend && python -m benchmarks.bench_csv_parsing [--rows 200000] [--runs 3]
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+
+from app.utils import ImportSummary, parse_csv_with_profile
+
+PROFILE = {
+    "column_mapping": {"date": "Datum", "amount": "Betrag", "amount_type": "Typ", "description": ["Text", "Ref"]},
+    "date_format": "%d.%m.%Y",
+}
+
+SHOPS = ["COOP", "MIGROS", "SBB CFF FFS", "STARBUCKS", "DIGITEC", "GALAXUS", "SALARY", "RENT", "SWISSCOM", "DENNER"]
+
+def make_csv(rows: int) -> bytes:
+    lines = ["Datum,Betrag,Typ,Text,Ref"]
+    for i in range(rows):
+        # Mostly small card payments, so amounts repeat as in real exports
+        amount = f"{random.randint(1, 300)}.{random.choice(['00', '50', '90', '95', str(random.randint(10, 99))])}"
+        if i % 7 == 0:
+            amount = f"\"{random.randint(1, 9)}'{random.randint(0, 999):03d}.{random.randint(0, 99):02d}\""
+        lines.append(f"{1 + i % 28:02d}.{1 + i % 12:02d}.{2015 + i % 10},{amount},{'CD'[i % 3 > 0]},"
+                     f"{random.choice(SHOPS)} {i % 500},R{i}")
+    return ("\n".join(lines) + "\n").encode()
+
+def run(rows: int, runs: int):
+    content = make_csv(rows)
+    timings = []
+    for _ in range(runs):
+        summary = ImportSummary()
+        start = time.perf_counter()
+        parsed = parse_csv_with_profile(content, PROFILE, summary)
+        timings.append(time.perf_counter() - start)
+        assert len(parsed) == rows
+        # Don't let the previous result grow the heap the next run's GC has to scan
+        del parsed
+        gc.collect()
+    print(f"parse_csv_with_profile {rows} rows: median {statistics.median(timings):.3f}s  "
+          f"min {min(timings):.3f}s  ({runs} runs, {len(content) / 1e6:.1f} MB)")
+    return statistics.median(timings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="rows in the generated CSV")
+    parser.add_argument("--runs", type=int, default=3, help="number of timed parses")
+    args = parser.parse_args()
+    random.seed(0)
+    run(args.rows, args.runs)
@@ -0,0 +1,98 @@
+"""
+Measures read latency of a dashboard-style query while an import is writing,
+for each SQLite preset in app.config.SQLITE_PRESETS.
+
+    cd backend && python -m benchmarks.bench_sqlite_pragmas [--rows 20000] [--batches 10]
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.config import SQLITE_PRESETS
+from app.database import Base, apply_sqlite_pragmas
+from app.importer import calculate_hash, import_transactions
+
+# Transaction list of the dashboard: latest 50 rows via the date index
+READ_QUERY = text("SELECT id, date, description, amount FROM transactions ORDER BY date DESC, id DESC LIMIT 50")
+
+def _rows(account_id, batch, size):
+    rows = []
+    for i in range(size):
+        d = datetime.date(2020 + i % 5, 1 + i % 12, 1 + i % 28)
+        amount = -round(random.uniform(1, 500), 2)
+        description = f"SHOP {batch}-{i}"
+        rows.append({
+            "date": d, "amount": amount, "description": description, "raw_data": {"Text": description},
+            "account_id": account_id, "transaction_hash": calculate_hash(d, amount, description, account_id),
+        })
+    return rows
+
+def _engine(path, preset):
+    return apply_sqlite_pragmas(
+        create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}),
+        SQLITE_PRESETS[preset],
+    )
+
+def _writer(path, preset, account_id, rows_per_batch, batches, result):
+    # Runs in its own process, like a second worker, so the GIL doesn't skew read latencies
+    random.seed(1)
+    Session = sessionmaker(bind=_engine(path, preset))
+    start = time.perf_counter()
+    with Session() as db:
+        for batch in range(batches):
+            import_transactions(db, _rows(account_id, batch, rows_per_batch))
+            db.commit()
+    result.value = time.perf_counter() - start
+
+def run(preset, rows_per_batch, batches):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = _engine(path, preset)
+    Base.metadata.create_all(bind=engine)
+
+    with sessionmaker(bind=engine)() as db:
+        account = models.Account(name="Bench", type="Checking")
+        db.add(account)
+        db.commit()
+        account_id = account.id
+        import_transactions(db, _rows(account_id, "seed", rows_per_batch))
+        db.commit()
+
+    write_time = multiprocessing.Value("d", 0.0)
+    writer = multiprocessing.Process(target=_writer, args=(path, preset, account_id, rows_per_batch, batches, write_time))
+    writer.start()
+
+    latencies = []
+    with engine.connect() as conn:
+        while writer.is_alive():
+            start = time.perf_counter()
+            conn.execute(READ_QUERY).all()
+            conn.rollback()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+    writer.join()
+    write_time = write_time.value
+    engine.dispose()
+
+    latencies.sort()
+    ms = lambda s: f"{s * 1000:8.1f}"
+    print(f"{preset:12} import {write_time:6.2f}s  reads {len(latencies):5}  "
+          f"p50 {ms(statistics.median(latencies))}ms  "
+          f"p95 {ms(latencies[int(len(latencies) * 0.95)])}ms  max {ms(latencies[-1])}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="rows per import batch")
+    parser.add_argument("--batches", type=int, default=10, help="number of committed import batches")
+    args = parser.parse_args()
+    random.seed(0)
+    for preset in SQLITE_PRESETS:
+        run(preset, args.rows, args.batches)
@@ -0,0 +1,55 @@
+"""
+Measures how long importing the API takes in a fresh interpreter, using
+`python -X importtime`, and lists the slowest imports.
+
+    cd backend && python -m benchmarks.bench_startup [--module app.main] [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(module: str = "app.main"):
+    """
+    Imports `module` in a new interpreter and returns ({imported module:
+    cumulative microseconds}, set of all modules loaded afterwards).
+    """
+    probe = f"import sys, {module}; print(','.join(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cum)
+    return cumulative, set(proc.stdout.strip().split(","))
+
+def top_level(cumulative):
+    """Cumulative time per top-level package, e.g. {'fastapi': ..., 'sqlalchemy': ...}."""
+    result = {}
+    for name, us in cumulative.items():
+        root = name.split(".")[0]
+        result[root] = max(result.get(root, 0), us)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main", help="module to import")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters")
+    parser.add_argument("--top", type=int, default=15, help="number of packages to list")
+    args = parser.parse_args()
+
+    runs = [measure(args.module)[0] for _ in range(args.runs)]
+    totals = [r[args.module] / 1000 for r in runs]
+    print(f"import {args.module}: median {statistics.median(totals):.0f}ms  "
+          f"min {min(totals):.0f}ms  max {max(totals):.0f}ms  ({args.runs} runs)")
+    packages = top_level(runs[totals.index(statistics.median_low(totals))])
+    for name, us in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"  {name:30} {us / 1000:8.1f}ms")
@@ -0,0 +1,101 @@
+"""
+Compares GET /transactions/ response times for the previous joinedload
+listing, the ORM listing with selectinload for labels, and lean mode.
+
+    cd backend && python -m benchmarks.bench_transaction_listing [--rows 20000]
+"""
+import argparse
+import datetime
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, joinedload, sessionmaker
+
+from app import models, schemas
+from app.database import Base, get_db
+from app.main import app
+
+PAGE_SIZES = (100, 1000, 10000)
+
+def _joinedload_listing(limit: int = 100, db: Session = Depends(get_db)):
+    # The listing before selectinload/lean mode
+    return db.query(models.Transaction).options(
+        joinedload(models.Transaction.category),
+        joinedload(models.Transaction.to_account),
+        joinedload(models.Transaction.labels)
+    ).order_by(models.Transaction.date.desc()).limit(limit).all()
+
+app.add_api_route("/bench/transactions-joinedload", _joinedload_listing, response_model=List[schemas.Transaction])
+# Ahead of the SPA catch-all route
+app.router.routes.insert(0, app.router.routes.pop())
+
+def _seed(db, rows):
+    accounts = [models.Account(name=f"Account {i}", type="Checking") for i in range(3)]
+    categories = [models.Category(name=f"Category {i}") for i in range(20)]
+    labels = [models.Label(name=f"Label {i}") for i in range(5)]
+    db.add_all(accounts + categories + labels)
+    db.flush()
+    db.execute(models.Transaction.__table__.insert(), [{
+        "date": datetime.date(2020, 1, 1) + datetime.timedelta(days=i // 10),
+        "description": f"MERCHANT {i % 700} PURCHASE",
+        "amount": -round(random.uniform(1, 500), 2),
+        "account_id": accounts[i % 3].id,
+        "category_id": categories[i % 20].id if i % 7 else None,
+        "is_transfer": 0,
+        "is_manual": 0,
+        # Typical bank export row
+        "raw_data": {f"Column {c}": f"value {i} {c} " * 3 for c in range(12)},
+    } for i in range(rows)])
+    db.execute(models.transaction_labels.insert(), [
+        {"transaction_id": tx_id, "label_id": labels[tx_id % 5].id}
+        for tx_id in range(1, rows + 1) if tx_id % 3 == 0
+    ])
+    db.commit()
+
+def _time(client, url, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, params=params)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200 and response.headers["content-type"] == "application/json", response.text[:200]
+    return statistics.median(timings) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="transactions in the benchmark database")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel("WARNING")
+    random.seed(0)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        _seed(db, args.rows)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+
+    print(f"{'rows':>6} {'joinedload':>12} {'selectinload':>13} {'lean':>8}")
+    for limit in PAGE_SIZES:
+        joined = _time(client, "/bench/transactions-joinedload", {"limit": limit}, args.repeat)
+        selectin = _time(client, "/transactions/", {"limit": limit}, args.repeat)
+        lean = _time(client, "/transactions/", {"limit": limit, "lean": True}, args.repeat)
+        print(f"{limit:>6} {joined:>10.1f}ms {selectin:>11.1f}ms {lean:>6.1f}ms")
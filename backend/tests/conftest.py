@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker
 
 from app.main import app
 from app.database import Base, get_db
+from app.cache import response_cache
 from app import models # Important for Base.metadata to discover tables
 
 from sqlalchemy.pool import StaticPool
@@ -41,6 +42,8 @@ def client(db):
             pass # DB connection closed in db fixture
 
     app.dependency_overrides[get_db] = override_get_db
+    # Every test reuses the same in-memory database URL
+    response_cache.clear()
     with TestClient(app) as c:
         yield c
     # Clear overrides after the test
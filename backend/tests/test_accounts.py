@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.cache import data_version
+from app.database import Base, get_db
+from app.main import app, sync_transfer_categories
+
+# Creates an account and its transfer category, as another worker process would
+_OTHER_WORKER = """
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app import models
+from app.main import sync_transfer_categories
+
+with Session(create_engine(sys.argv[1])) as db:
+    db.add(models.Account(name="Savings", type="Savings"))
+    db.commit()
+    sync_transfer_categories(db)
+"""
+
+
+def _transfer_categories(db):
+    return {
+        c.target_account_id: c.name
+        for c in db.query(models.Category).filter(models.Category.target_account_id != None)
+    }
+
+
+def test_account_and_category_reads_do_not_write(client, db):
+    account = client.post("/accounts/", json={"name": "Savings", "type": "Savings"}).json()
+    assert _transfer_categories(db) == {account["id"]: "↳ Savings"}
+
+    version = data_version(db)
+    assert [a["name"] for a in client.get("/accounts/").json()] == ["Savings"]
+    categories = client.get("/categories/").json()
+    assert {c["name"] for c in categories} == {"Transfer", "↳ Savings"}
+    client.get("/categories/")
+    assert data_version(db) == version
+
+
+def test_sync_transfer_categories_follows_renames(db):
+    account = models.Account(name="Savings", type="Savings")
+    db.add(account)
+    db.commit()
+    assert sync_transfer_categories(db) is True
+    assert sync_transfer_categories(db) is False
+
+    account.name = "Rainy Day"
+    db.commit()
+    assert sync_transfer_categories(db) is True
+    assert _transfer_categories(db) == {account.id: "↳ Rainy Day"}
+
+
+def test_account_and_category_lists_follow_other_workers(client, tmp_path):
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SharedSession = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = SharedSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    assert client.get("/accounts/").json() == []
+    assert client.get("/categories/").json() == []
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", _OTHER_WORKER, url], cwd=backend_dir, check=True)
+
+    assert [a["name"] for a in client.get("/accounts/").json()] == ["Savings"]
+    assert {c["name"] for c in client.get("/categories/").json()} == {"Transfer", "↳ Savings"}
+    engine.dispose()
@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app import models, rollups
+from app.analytics import AnalyticsFilters, aggregate
+
+
+@pytest.fixture()
+def transactions(db):
+    checking = models.Account(name="Checking", type="Checking")
+    savings = models.Account(name="Savings", type="Savings")
+    food = models.Category(name="Food")
+    db.add_all([checking, savings, food])
+    db.flush()
+    rows = [
+        models.Transaction(
+            date=date(2024, 1 + i % 4, 1 + (i * 7) % 28), amount=(-1) ** i * (i + 1), description=f"TX {i}",
+            account_id=(checking, savings)[i % 3 == 0].id, category_id=None if i % 5 == 0 else food.id,
+            is_transfer=1 if i % 11 == 0 else 0,
+        )
+        for i in range(120)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return checking, rows
+
+
+def _expected(rows, start_date=None, end_date=None, account_id=None):
+    """Reference totals computed in Python, grouped by month."""
+    result = {}
+    for t in rows:
+        if (start_date and t.date.isoformat() < start_date) or (end_date and t.date.isoformat() > end_date):
+            continue
+        if account_id is not None and t.account_id != account_id:
+            continue
+        inflow, outflow, count, uncategorized = result.get(t.date.strftime("%Y-%m"), (0.0, 0.0, 0, 0))
+        spending = not t.is_transfer
+        result[t.date.strftime("%Y-%m")] = (
+            inflow + (t.amount if spending and t.amount > 0 else 0),
+            outflow + (t.amount if spending and t.amount < 0 else 0),
+            count + 1,
+            uncategorized + (1 if spending and t.category_id is None else 0),
+        )
+    return result
+
+
+@pytest.mark.parametrize("start, end, by_account", [
+    (None, None, False),
+    ("2024-02-01", "2024-03-31", False),
+    ("2024-01-10", "2024-03-20", True),
+    ("2024-02-03", "2024-02-17", True),
+])
+def test_aggregate_matches_reference(db, transactions, start, end, by_account):
+    checking, rows = transactions
+    account_id = checking.id if by_account else None
+    totals = aggregate(db, ("month",), AnalyticsFilters(start, end, account_id))
+    expected = _expected(rows, start, end, account_id)
+    assert {month: tuple(t) for (month,), t in totals.items()} == pytest.approx(expected)
+
+
+def test_endpoints_share_filters(client, db, transactions):
+    checking, rows = transactions
+    params = {"start_date": "2024-01-10", "end_date": "2024-03-20", "account_id": checking.id}
+    expected = _expected(rows, **params)
+
+    stats = client.get("/transactions/stats", params=params).json()
+    assert stats == {"total": sum(e[2] for e in expected.values()), "uncategorized": sum(e[3] for e in expected.values())}
+
+    monthly = client.get("/analytics/monthly", params=params).json()
+    assert [(m["month"], m["inflow"], -m["outflow"]) for m in monthly] == pytest.approx(
+        [(month, e[0], e[1]) for month, e in sorted(expected.items())]
+    )
+
+    summary = client.get("/analytics/summary", params=params).json()
+    assert summary["total_income"] == pytest.approx(sum(e[0] for e in expected.values()))
+    assert summary["total_spending"] == pytest.approx(-sum(e[1] for e in expected.values()))
+
+
+def test_null_is_transfer_counts_the_same_in_partial_and_whole_months(db):
+    account = models.Account(name="Checking", type="Checking")
+    db.add(account)
+    db.flush()
+    db.add(models.Transaction(date=date(2024, 2, 10), amount=-30.0, description="LEGACY", account_id=account.id))
+    db.flush()
+    # Rows from before the column had a default
+    db.execute(text("UPDATE transactions SET is_transfer = NULL"))
+    rollups.rebuild(db)
+    db.commit()
+    assert db.query(models.Transaction.is_transfer).scalar() is None
+
+    whole = aggregate(db, (), AnalyticsFilters("2024-02-01", "2024-02-29"))
+    partial = aggregate(db, (), AnalyticsFilters("2024-02-05", "2024-02-20"))
+    assert whole == partial == {(): (0.0, -30.0, 1, 1)}
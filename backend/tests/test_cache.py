@@ -0,0 +1,99 @@
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import models
+from app.cache import ResponseCache, response_cache
+from app.database import Base
+from app.jobs import runner
+
+
+def test_analytics_responses_are_cached_until_a_write(client, db):
+    account = models.Account(name="Checking", type="Checking")
+    food = models.Category(name="Food")
+    db.add_all([account, food])
+    db.flush()
+    tx = models.Transaction(date=date(2024, 1, 5), amount=-20, description="STARBUCKS", account_id=account.id)
+    db.add(tx)
+    db.commit()
+
+    first = client.get("/transactions/stats")
+    hits = response_cache.hits
+    second = client.get("/transactions/stats")
+    assert response_cache.hits == hits + 1
+    assert first.json() == second.json() == {"total": 1, "uncategorized": 1}
+    etag = first.headers["etag"]
+    assert second.headers["etag"] == etag
+
+    # Other query parameters are cached separately
+    assert client.get("/transactions/stats", params={"account_id": account.id + 1}).json()["total"] == 0
+
+    not_modified = client.get("/transactions/stats", headers={"If-None-Match": etag})
+    assert (not_modified.status_code, not_modified.content) == (304, b"")
+
+    # Any committed write invalidates, including the ones made by background jobs
+    assert client.patch(f"/transactions/{tx.id}", json={"category_id": food.id}).status_code == 200
+    after_patch = client.get("/transactions/stats", headers={"If-None-Match": etag})
+    assert after_patch.status_code == 200
+    assert after_patch.json() == {"total": 1, "uncategorized": 0}
+
+    db.add(models.Transaction(date=date(2024, 1, 6), amount=-4, description="COFFEE", account_id=account.id))
+    db.add(models.CategorizationRule(pattern="COFFEE", target_category_id=food.id))
+    db.commit()
+    etag = client.get("/transactions/stats").headers["etag"]
+    body = client.post("/rules/re-categorize/", params={"background": True}).json()
+    runner.wait(body["job_id"], timeout=10)
+    after_job = client.get("/transactions/stats", headers={"If-None-Match": etag})
+    assert after_job.status_code == 200
+    assert after_job.json() == {"total": 2, "uncategorized": 0}
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache._put("a", 1, b"aaa")
+    cache._put("b", 1, b"bbb")
+    assert cache._get("a", 1) == b"aaa"
+    cache._put("c", 1, b"ccc")
+    assert cache._get("b", 1) is None
+    assert cache._get("a", 1) == b"aaa"
+
+    # Size bound, and entries from an older data version are ignored
+    cache._put("d", 1, b"dddddddd")
+    assert (cache._get("a", 1), cache._get("c", 1)) == (None, None)
+    assert cache._get("d", 2) is None
+
+
+def test_writes_of_one_worker_invalidate_the_others(tmp_path):
+    # Two workers: separate engines (connection pools) and caches on one database file
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    engines = [create_engine(url), create_engine(url)]
+    Base.metadata.create_all(bind=engines[0])
+    sessions = [sessionmaker(bind=e)() for e in engines]
+    caches = [ResponseCache(), ResponseCache()]
+    request = Request({"type": "http", "method": "GET", "path": "/accounts/", "query_string": b"", "headers": []})
+
+    def accounts(i):
+        def compute():
+            return [a.name for a in sessions[i].query(models.Account).order_by(models.Account.id)]
+        response = caches[i].respond(request, sessions[i], compute)
+        sessions[i].commit()
+        return response
+
+    assert accounts(0).body == accounts(1).body == b"[]"
+    etag = accounts(0).headers["etag"]
+
+    sessions[1].add(models.Account(name="Checking", type="Checking"))
+    sessions[1].commit()
+    misses = caches[0].misses
+    first = accounts(0)
+    assert (first.body, caches[0].misses) == (b'["Checking"]', misses + 1)
+    assert first.headers["etag"] != etag
+    # Reads don't change the version
+    assert accounts(0).headers["etag"] == first.headers["etag"]
+    assert caches[0].misses == misses + 1
+
+    for session, engine in zip(sessions, engines):
+        session.close()
+        engine.dispose()
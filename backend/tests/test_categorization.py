@@ -0,0 +1,288 @@
+from datetime import date
+
+import pandas as pd
+
+from app import models
+from app.categorization import categorize_transaction, categorize_transactions, get_categorizer, recategorize_all, rules_version
+from app.database import Base
+from app.services.categorizer import TransactionCategorizer
+
+
+def test_categorize_many_matches_single_calls():
+    tc = TransactionCategorizer()
+    tc.add_exact_match("REVOLUT", "__ID_TRANSFER__:2")
+    tc.add_regex_pattern("UBER", "__ID_CAT__:1")
+    tc.add_regex_pattern("EATS", "__ID_LABEL__:3")
+
+    descriptions = pd.Series(["UBER EATS", "revolut", "", "unknown", "UBER EATS"], index=[10, 11, 12, 13, 14])
+    result = tc.categorize_many(descriptions)
+
+    assert list(result.index) == [10, 11, 12, 13, 14]
+    for idx, description in descriptions.items():
+        single = tc.categorize(description)
+        assert result.loc[idx, "category"] == single["category"]
+        assert result.loc[idx, "source"] == single["source"]
+        assert result.loc[idx, "labels"] == tc.get_labels(description)
+
+    assert tc.categorize_many([None])["category"].tolist() == ["Uncategorized"]
+
+
+def _seed(db):
+    account = models.Account(name="Checking", type="Checking")
+    food = models.Category(name="Food")
+    label = models.Label(name="Coffee")
+    db.add_all([account, food, label])
+    db.flush()
+    db.add_all([
+        models.CategorizationRule(pattern="STARBUCKS", priority=0, target_category_id=food.id),
+        models.CategorizationRule(pattern="COFFEE|STARBUCKS", priority=1, target_label_id=label.id),
+    ])
+    db.commit()
+    return account, food, label
+
+
+def test_recategorize_all(db):
+    account, food, label = _seed(db)
+    db.add_all([
+        models.Transaction(description="STARBUCKS ZURICH", amount=-5, account_id=account.id),
+        models.Transaction(description="RENT", amount=-1000, account_id=account.id),
+        models.Transaction(description="STARBUCKS BERN", amount=-4, account_id=account.id, is_manual=1),
+    ])
+    db.commit()
+
+    progress = []
+    matches, changes, failed = recategorize_all(db, chunk_size=1, progress=lambda done, total: progress.append((done, total)))
+    assert (matches, changes, failed) == (1, 1, [])
+    assert progress == [(1, 2), (2, 2)]
+
+    by_desc = {t.description: t for t in db.query(models.Transaction).all()}
+    assert by_desc["STARBUCKS ZURICH"].category_id == food.id
+    assert [l.id for l in by_desc["STARBUCKS ZURICH"].labels] == [label.id]
+    assert by_desc["STARBUCKS BERN"].category_id is None
+
+    # A second pass matches again but changes nothing
+    assert recategorize_all(db)[:2] == (1, 0)
+
+
+
+def test_categorize_unsaved_transaction(db):
+    account, food, label = _seed(db)
+    transaction = models.Transaction(description="STARBUCKS ZURICH", amount=-5, account_id=account.id)
+    db.add(transaction)
+
+    assert categorize_transaction(db, transaction)
+    db.commit()
+    assert transaction.category_id == food.id
+    assert [l.name for l in transaction.labels] == ["Coffee"]
+
+
+def test_categorize_transactions_matches_recategorize_all(db):
+    account, food, label = _seed(db)
+    descriptions = ["STARBUCKS ZURICH", "COFFEE SHOP", "RENT", "STARBUCKS MANUAL"]
+    transactions = [models.Transaction(description=d, amount=-1, account_id=account.id) for d in descriptions]
+    transactions[-1].is_manual = 1
+    db.add_all(transactions)
+
+    assert categorize_transactions(db, transactions) == [True, True, False, False]
+    db.commit()
+    state = [(t.category_id, t.matched_rule_id, sorted(l.name for l in t.labels)) for t in transactions]
+    assert state[-1] == (None, None, [])
+    assert recategorize_all(db)[1] == 0
+
+    assert categorize_transactions(db, transactions[-1:], force=True) == [True]
+    assert transactions[-1].category_id == food.id
+
+def test_upload_csv_categorizes_in_batch(client, db):
+    account, food, label = _seed(db)
+    profile = models.CSVProfile(
+        name="Bank",
+        column_mapping={"date": "Date", "amount": "Amount", "description": "Text"},
+        date_format="%Y-%m-%d",
+    )
+    db.add(profile)
+    db.commit()
+
+    csv = "Date,Amount,Text\n2024-01-02,-5.50,STARBUCKS ZURICH\n2024-01-03,-20,MIGROS\n"
+    response = client.post(
+        f"/upload-csv/?account_id={account.id}&profile_id={profile.id}",
+        files={"file": ("bank.csv", csv, "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+
+    # Re-importing the same file only produces duplicates
+    response = client.post(
+        f"/upload-csv/?account_id={account.id}&profile_id={profile.id}",
+        files={"file": ("bank.csv", csv, "text/csv")},
+    )
+    assert response.json()["imported"] == 0
+    assert response.json()["skipped"] == 2
+    summary = response.json()["summary"]
+    assert (summary["rows_total"], summary["rows_parsed"], summary["failures"]) == (2, 2, {"duplicate": 2})
+    assert set(summary["timings_ms"]) == {"parse", "prepare", "dedupe"}
+
+    starbucks = db.query(models.Transaction).filter(models.Transaction.description == "STARBUCKS ZURICH").one()
+    assert starbucks.category_id == food.id
+    assert [l.name for l in starbucks.labels] == ["Coffee"]
+
+
+def test_upload_csv_streaming(client, db):
+    account, food, label = _seed(db)
+    profile = models.CSVProfile(
+        name="Bank",
+        column_mapping={"date": "Date", "amount": "Amount", "description": "Text"},
+        date_format="%Y-%m-%d",
+    )
+    db.add(profile)
+    db.commit()
+
+    csv = "Date,Amount,Text\n2024-01-02,-5.50,STARBUCKS ZURICH\n2024-01-03,-20,MIGROS\n2024-01-03,-20,MIGROS\n,1,NO DATE\n"
+    url = f"/upload-csv/?account_id={account.id}&profile_id={profile.id}"
+    body = client.post(url + "&stream=true&chunk_size=1", files={"file": ("bank.csv", csv, "text/csv")}).json()
+    assert (body["imported"], body["skipped"]) == (2, 1)
+    assert (body["summary"]["chunks"], body["summary"]["failures"]) == (4, {"duplicate": 1, "missing date": 1})
+    progress = body["summary"]["progress"]
+    assert [(p["rows_read"], p["imported"]) for p in progress] == [(1, 1), (2, 2), (3, 2), (4, 2)]
+    assert progress[-1]["bytes_read"] == progress[-1]["bytes_total"] == len(csv)
+
+    # Same hashes as the in-memory import
+    body = client.post(url, files={"file": ("bank.csv", csv, "text/csv")}).json()
+    assert (body["imported"], body["skipped"]) == (0, 3)
+
+    # A parse error in a later chunk discards the whole file
+    broken = "Date,Amount,Text\n2024-02-01,-1,ONE\n2024-02-02,-2,\"UNCLOSED\n"
+    for mode in ("&stream=true&chunk_size=1", ""):
+        response = client.post(url + mode, files={"file": ("bank.csv", broken, "text/csv")})
+        assert response.status_code == 400
+        assert db.query(models.Transaction).count() == 2
+
+
+def test_rule_changes_recategorize_incrementally(client, db):
+    account, food, label = _seed(db)
+    travel = models.Category(name="Travel")
+    db.add(travel)
+    db.add_all([
+        models.Transaction(description="STARBUCKS AIRPORT", amount=-5, account_id=account.id),
+        models.Transaction(description="SBB TICKET", amount=-50, account_id=account.id),
+        models.Transaction(description="RENT", amount=-1000, account_id=account.id),
+    ])
+    db.commit()
+    recategorize_all(db)
+
+    # Higher-priority rule overrides the STARBUCKS category for the airport row only
+    response = client.post("/rules/", params={"background": False}, json={"pattern": "AIRPORT|SBB", "priority": -1, "target_category_id": travel.id})
+    body = response.json()
+    assert (body["matches"], body["changes"]) == (2, 2)
+    assert recategorize_all(db)[1] == 0
+
+    rule_id = db.query(models.CategorizationRule).filter(models.CategorizationRule.target_category_id == travel.id).one().id
+    body = client.put(f"/rules/{rule_id}", params={"background": False}, json={"pattern": "SBB"}).json()
+    assert (body["matches"], body["changes"]) == (1, 1)
+    assert recategorize_all(db)[1] == 0
+
+    body = client.delete(f"/rules/{rule_id}", params={"background": False}).json()
+    assert (body["matches"], body["changes"]) == (0, 1)
+    assert recategorize_all(db)[1] == 0
+    sbb = db.query(models.Transaction).filter(models.Transaction.description == "SBB TICKET").one()
+    assert sbb.category_id is None
+
+
+
+def test_rule_change_counts_every_match(client, db):
+    account, food, label = _seed(db)
+    db.add_all([
+        models.Transaction(description="Starbucks Zurich", amount=-5, account_id=account.id),
+        models.Transaction(description="\u017ftarbucks 50%_off", amount=-3, account_id=account.id),
+        models.Transaction(description="STARBUCKS", amount=-4, account_id=account.id, is_manual=1),
+        models.Transaction(description="RENT", amount=-1000, account_id=account.id),
+    ])
+    db.commit()
+    recategorize_all(db)
+
+    # The higher-priority STARBUCKS rule keeps both rows, but they still match
+    body = client.post("/rules/", params={"background": False}, json={"pattern": "starbucks", "priority": 2, "target_category_id": food.id}).json()
+    assert (body["matches"], body["changes"]) == (2, 0)
+
+    rule_id = db.query(models.CategorizationRule).filter(models.CategorizationRule.priority == 2).one().id
+    body = client.put(f"/rules/{rule_id}", params={"background": False}, json={"pattern": "50%_OFF"}).json()
+    assert (body["matches"], body["changes"]) == (1, 0)
+    body = client.put(f"/rules/{rule_id}", params={"background": False}, json={"pattern": "RENT", "priority": -1}).json()
+    assert (body["matches"], body["changes"]) == (1, 1)
+    assert recategorize_all(db)[1] == 0
+
+
+def test_rule_provenance(client, db):
+    account, food, label = _seed(db)
+    category_rule, label_rule = db.query(models.CategorizationRule).order_by(models.CategorizationRule.priority).all()
+    db.add_all([
+        models.Transaction(date=date(2024, 1, 2), description="STARBUCKS ZURICH", amount=-5, account_id=account.id),
+        models.Transaction(date=date(2024, 1, 3), description="COFFEE SHOP", amount=-3, account_id=account.id),
+    ])
+    db.commit()
+    recategorize_all(db)
+
+    starbucks = db.query(models.Transaction).filter(models.Transaction.description == "STARBUCKS ZURICH").one()
+    assert starbucks.matched_rule_id == category_rule.id
+    rows = db.execute(models.transaction_labels.select()).all()
+    assert {(r.label_id, r.rule_id) for r in rows} == {(label.id, label_rule.id)}
+
+    hits = client.get(f"/rules/{category_rule.id}/transactions").json()
+    assert [t["description"] for t in hits] == ["STARBUCKS ZURICH"]
+    hits = client.get(f"/rules/{label_rule.id}/transactions").json()
+    assert sorted(t["description"] for t in hits) == ["COFFEE SHOP", "STARBUCKS ZURICH"]
+
+
+def test_label_rule_delete_removes_only_rule_labels(client, db):
+    account, food, label = _seed(db)
+    label_rule = db.query(models.CategorizationRule).filter(models.CategorizationRule.target_label_id == label.id).one()
+    coffee = models.Transaction(description="COFFEE SHOP", amount=-3, account_id=account.id)
+    legacy = models.Transaction(description="TEA ROOM", amount=-3, account_id=account.id)
+    db.add_all([coffee, legacy])
+    db.flush()
+    legacy.labels.append(label)
+    db.commit()
+    recategorize_all(db)
+    assert [l.name for l in coffee.labels] == ["Coffee"]
+
+    body = client.delete(f"/rules/{label_rule.id}", params={"background": False}).json()
+    assert body["changes"] == 1
+    db.expire_all()
+    assert coffee.labels == []
+    assert [l.name for l in legacy.labels] == ["Coffee"]
+
+
+def test_categorizer_cache_follows_rules_version(db, tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    food = models.Category(name="Food")
+    db.add(food)
+    db.commit()
+    categorizer = get_categorizer(db)
+    assert get_categorizer(db) is categorizer
+    version = rules_version(db)
+
+    # A committed rule change bumps the version stored in the database
+    db.add(models.CategorizationRule(pattern="MIGROS", target_category_id=food.id))
+    db.commit()
+    assert rules_version(db) == version + 1
+    assert get_categorizer(db) is not categorizer
+    categorizer = get_categorizer(db)
+    assert categorizer.categorize("MIGROS 123")["category"] == f"__ID_CAT__:{food.id}"
+    assert get_categorizer(db) is categorizer
+
+    # Changes from another worker's session are seen, rolled back ones are not
+    with Session(bind=db.get_bind()) as worker:
+        worker.query(models.CategorizationRule).update({"priority": 5})
+        worker.rollback()
+        assert get_categorizer(db) is categorizer
+        worker.add(models.Label(name="Coffee"))
+        worker.commit()
+    assert get_categorizer(db) is not categorizer
+
+    # Other databases get their own instance
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    Base.metadata.create_all(other)
+    with Session(other) as other_db:
+        assert get_categorizer(other_db) is not get_categorizer(db)
+    other.dispose()
@@ -0,0 +1,49 @@
+import json
+import os
+
+import pytest
+
+from app import config
+
+
+@pytest.fixture()
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"current_db": "first.db"}))
+    monkeypatch.setattr(config, "CONFIG_PATH", str(path))
+    config.reload_config()
+    yield path
+    monkeypatch.undo()
+    config.reload_config()
+
+
+def test_config_is_served_from_memory(config_file, monkeypatch):
+    loads = []
+    load = config._load_config
+    monkeypatch.setattr(config, "_load_config", lambda: loads.append(1) or load())
+
+    for _ in range(3):
+        assert config.get_db_path() == os.path.join(config.DATA_DIR, "first.db")
+    assert config.get_config() == {"current_db": "first.db"}
+    assert len(loads) == 1
+
+    # save_config() updates the in-memory copy without another read
+    config.save_config({"current_db": "second.db"})
+    assert config.get_db_path() == os.path.join(config.DATA_DIR, "second.db")
+    assert len(loads) == 1
+
+
+def test_external_changes_are_picked_up_by_mtime(config_file, monkeypatch):
+    assert config.get_config() == {"current_db": "first.db"}
+    config_file.write_text(json.dumps({"current_db": "/tmp/other.db"}))
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    # Not before the next check is due
+    assert config.get_config() == {"current_db": "first.db"}
+    monkeypatch.setattr(config, "CONFIG_CHECK_INTERVAL", 0)
+    assert config.get_db_path() == "/tmp/other.db"
+
+    # Callers may modify the returned dict
+    config.get_config()["current_db"] = "changed.db"
+    assert config.get_config() == {"current_db": "/tmp/other.db"}
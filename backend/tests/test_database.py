@@ -0,0 +1,56 @@
+import os
+
+from sqlalchemy import create_engine
+
+from app import config
+from app.database import apply_sqlite_pragmas
+
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    engine = apply_sqlite_pragmas(create_engine(f"sqlite:///{tmp_path / 'test.db'}"), config.SQLITE_PRESETS["performance"])
+    with engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("temp_store") == 2  # MEMORY
+        assert pragma("busy_timeout") == 5000
+        assert pragma("cache_size") == -65536
+    engine.dispose()
+
+
+def test_sqlite_preset_from_config(monkeypatch):
+    monkeypatch.setattr(config, "get_config", lambda: {"sqlite_preset": "compat", "sqlite_pragmas": {"busy_timeout": 100}})
+    assert config.get_sqlite_pragmas() == {"busy_timeout": 100}
+
+    monkeypatch.setattr(config, "get_config", lambda: {})
+    assert config.get_sqlite_pragmas() == config.SQLITE_PRESETS[config.DEFAULT_SQLITE_PRESET]
+
+
+def test_select_database_switches_in_process(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import main
+    from app.database import registry
+
+    monkeypatch.setattr(config, "CONFIG_PATH", str(tmp_path / "config.json"))
+    config.reload_config()
+    first, second = str(tmp_path / "first.db"), str(tmp_path / "second.db")
+    main_mtime = os.stat(main.__file__).st_mtime_ns
+    try:
+        with TestClient(main.app) as client:
+            assert client.post("/databases/select", params={"db_name": first, "create_if_missing": True}).status_code == 200
+            client.post("/accounts/", json={"name": "Checking", "type": "Checking"})
+            engine = registry.get(first).engine
+
+            client.post("/databases/select", params={"db_name": second, "create_if_missing": True})
+            assert client.get("/accounts/").json() == []
+
+            client.post("/databases/select", params={"db_name": first})
+            assert [a["name"] for a in client.get("/accounts/").json()] == ["Checking"]
+            # The engine is reused and nothing triggered an auto-reload
+            assert registry.get(first).engine is engine
+            assert os.stat(main.__file__).st_mtime_ns == main_mtime
+    finally:
+        registry.dispose(first)
+        registry.dispose(second)
+        monkeypatch.undo()
+        config.reload_config()
@@ -0,0 +1,44 @@
+from datetime import date
+
+from app import models
+from app.categorization import sync_rules
+from app.importer import calculate_hash, import_transactions
+from app.utils import ImportSummary
+
+
+def _row(account_id, description, amount, day=1):
+    d = date(2024, 1, day)
+    return {
+        "date": d, "amount": amount, "description": description, "raw_data": {},
+        "account_id": account_id, "transaction_hash": calculate_hash(d, amount, description, account_id),
+    }
+
+
+def test_import_transactions_dedupes_and_categorizes(db):
+    account = models.Account(name="Checking", type="Checking")
+    food = models.Category(name="Food")
+    label = models.Label(name="Coffee")
+    db.add_all([account, food, label])
+    db.flush()
+    db.add_all([
+        models.CategorizationRule(pattern="STARBUCKS", priority=0, target_category_id=food.id),
+        models.CategorizationRule(pattern="COFFEE|STARBUCKS", priority=1, target_label_id=label.id),
+    ])
+    db.commit()
+    sync_rules(db)
+
+    assert import_transactions(db, [_row(account.id, "RENT", -1000)]) == 1
+    db.commit()
+
+    summary = ImportSummary()
+    rows = [_row(account.id, "RENT", -1000), _row(account.id, "STARBUCKS", -5), _row(account.id, "STARBUCKS", -5), _row(account.id, "MIGROS", -20, 2)]
+    assert import_transactions(db, rows, summary) == 2
+    db.commit()
+    assert summary.failures == {"duplicate": 2}
+
+    starbucks = db.query(models.Transaction).filter(models.Transaction.description == "STARBUCKS").one()
+    assert (starbucks.category_id, starbucks.is_transfer, starbucks.is_manual) == (food.id, 0, 0)
+    assert starbucks.matched_rule_id is not None
+    assert [l.name for l in starbucks.labels] == ["Coffee"]
+    rule_ids = {r.rule_id for r in db.execute(models.transaction_labels.select())}
+    assert None not in rule_ids
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event, text
+
+from app import models
+
+
+@contextmanager
+def _captured_selects(engine):
+    """Collects the SELECT statements (with parameters) run against `engine`."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "transactions" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _plans(db, statements):
+    conn = db.connection()
+    return [
+        " / ".join(row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+        for statement, parameters in statements
+    ]
+
+
+@pytest.fixture()
+def seeded(db):
+    account = models.Account(name="Checking", type="Checking")
+    other = models.Account(name="Savings", type="Savings")
+    food = models.Category(name="Food")
+    db.add_all([account, other, food])
+    db.flush()
+    # Mostly categorized rows, so the planner has realistic statistics to work with
+    db.add_all([
+        models.Transaction(
+            date=date(2024, 1 + i % 12, 1 + i % 28), amount=(-1) ** i * i, description=f"TX {i}",
+            account_id=(account, other)[i % 2].id, category_id=None if i % 10 == 0 else food.id,
+            is_transfer=1 if i % 25 == 0 else 0,
+        )
+        for i in range(500)
+    ])
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return account, food
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("/transactions/?account_id={account}", ["ix_transactions_account_date"]),
+    ("/transactions/?category_id={category}", ["ix_transactions_category_date"]),
+    ("/transactions/?account_id={account}&lean=true", ["ix_transactions_account_date"]),
+    ("/transactions/?is_uncategorized=true", ["ix_transactions_uncategorized"]),
+    # Whole months are read from monthly_rollups, only partial edge months from transactions
+    ("/transactions/stats?account_id={account}", []),
+    ("/transactions/stats?start_date=2024-01-15", ["COVERING INDEX ix_transactions_date_amount"]),
+    ("/analytics/monthly", []),
+    ("/analytics/summary?start_date=2024-01-01", []),
+    # Grouped by category the planner may also pick ix_transactions_category_date
+    ("/analytics/summary?start_date=2024-01-15", ["SEARCH transactions USING"]),
+    ("/analytics/monthly?start_date=2024-01-15&account_id={account}", ["ix_transactions_account_date"]),
+])
+def test_query_plans_use_indexes(client, db, seeded, url, expected):
+    account, food = seeded
+    with _captured_selects(db.get_bind()) as statements:
+        assert client.get(url.format(account=account.id, category=food.id)).status_code == 200
+    plans = _plans(db, statements)
+
+    assert len(plans) == len(expected)
+    for plan, index in zip(plans, expected):
+        assert index in plan, plan
+        assert "SCAN transactions" not in plan, plan
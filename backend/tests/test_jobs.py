@@ -0,0 +1,50 @@
+from app import models
+from app.jobs import JobRunner, runner
+
+
+def test_queued_jobs_are_coalesced(db):
+    local = JobRunner()
+    local._ensure_worker = lambda: None  # keep everything queued
+
+    factory = lambda: db
+    first = local.submit(factory, "db-a", (1, None, "UBER"))
+    second = local.submit(factory, "db-a", (2, "SBB", "SBB|CFF"))
+    other_db = local.submit(factory, "db-b", (3, None, "COOP"))
+    assert first is second
+    assert other_db is not first
+    assert first.kind == "rules"
+    assert first.rule_changes == [(1, None, "UBER"), (2, "SBB", "SBB|CFF")]
+
+    # A full re-categorization absorbs the queued rule changes
+    full = local.submit(factory, "db-a")
+    assert full is first
+    assert (full.kind, full.rule_changes) == ("all", [])
+    assert local.submit(factory, "db-a", (4, None, "MIGROS")).rule_changes == []
+
+
+def test_background_recategorization(client, db):
+    account = models.Account(name="Checking", type="Checking")
+    food = models.Category(name="Food")
+    db.add_all([account, food])
+    db.flush()
+    db.add(models.Transaction(description="STARBUCKS", amount=-5, account_id=account.id))
+    db.commit()
+
+    body = client.post("/rules/", json={"pattern": "STARBUCKS", "target_category_id": food.id}).json()
+    assert "job_id" in body
+    runner.wait(body["job_id"], timeout=10)
+
+    job = client.get(f"/jobs/{body['job_id']}").json()
+    assert job["status"] == "completed"
+    assert (job["matches"], job["changes"]) == (1, 1)
+
+    body = client.post("/rules/re-categorize/").json()
+    runner.wait(body["job_id"], timeout=10)
+    job = client.get(f"/jobs/{body['job_id']}").json()
+    assert (job["status"], job["changes"], job["progress"]) == ("completed", 0, {"done": 1, "total": 1})
+
+    # background=false keeps the synchronous response
+    body = client.post("/rules/re-categorize/", params={"background": False}).json()
+    assert (body["count"], body["matches"]) == (0, 1)
+
+    assert client.get("/jobs/unknown").status_code == 404
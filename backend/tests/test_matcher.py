@@ -0,0 +1,38 @@
+import re
+
+from app.services.categorizer import TransactionCategorizer
+from app.services.matcher import MultiPatternMatcher, required_literal
+
+
+def test_required_literal():
+    assert required_literal("COOP.*THALWIL") == "thalwil"
+    assert required_literal("(SALARY)+ \\d+") == "salary"
+    assert required_literal("x?AMZN") == "amzn"
+    assert required_literal("UBER|LYFT") is None
+    assert required_literal("\\d+") is None
+
+
+def test_matcher_agrees_with_linear_scan():
+    raw = ["UBER", "COOP.*THALWIL", "\\d{4}", "ſhell", "(?i:rent)", "MIGROS", "", "SBB|CFF"]
+    patterns = [re.compile(p, re.IGNORECASE) for p in raw]
+    is_label = [False, False, True, False, True, True, True, False]
+    matcher = MultiPatternMatcher(patterns, is_label)
+
+    texts = ["uber eats", "COOP-1932 THALWIL", "SHELL 1234", "Rent Migros", "cff ticket", "nothing"]
+    for text in texts:
+        category = next((i for i, p in enumerate(patterns) if not is_label[i] and p.search(text)), None)
+        labels = [i for i, p in enumerate(patterns) if is_label[i] and p.search(text)]
+        assert matcher.match(text) == (category, labels)
+
+
+def test_categorizer_priority_order():
+    tc = TransactionCategorizer()
+    tc.add_regex_pattern("COOP", "__ID_CAT__:1")
+    tc.add_regex_pattern("COOP.*THALWIL", "__ID_CAT__:2")
+    tc.add_regex_pattern("THALWIL", "__ID_LABEL__:7")
+    assert tc.categorize("COOP-1932 THALWIL")["category"] == "__ID_CAT__:1"
+    assert tc.get_labels("COOP-1932 THALWIL") == ["7"]
+
+    # Adding a rule invalidates the compiled matcher
+    tc.add_regex_pattern("1932", "__ID_LABEL__:8")
+    assert tc.get_labels("COOP-1932 THALWIL") == ["7", "8"]
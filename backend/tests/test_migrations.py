@@ -0,0 +1,84 @@
+from datetime import date
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import migrations, models, rollups
+from app.database import Base
+
+# Schema of a database created before labels, transfers, hashes and rule provenance
+LEGACY_SCHEMA = [
+    "CREATE TABLE accounts (id INTEGER PRIMARY KEY, name VARCHAR, type VARCHAR)",
+    "CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR, parent_id INTEGER REFERENCES categories(id))",
+    "CREATE UNIQUE INDEX ix_categories_name ON categories (name)",
+    "CREATE TABLE categorization_rules (id INTEGER PRIMARY KEY, pattern VARCHAR, target_category_id INTEGER)",
+    "CREATE TABLE transactions (id INTEGER PRIMARY KEY, date DATE, amount FLOAT, description VARCHAR, "
+    "raw_data JSON, account_id INTEGER REFERENCES accounts(id), category_id INTEGER REFERENCES categories(id))",
+    "INSERT INTO accounts VALUES (1, 'Checking', 'Checking')",
+    "INSERT INTO transactions (date, amount, description, account_id) VALUES "
+    "('2024-01-05', -20.0, 'STARBUCKS', 1), ('2024-01-05', -20.0, 'STARBUCKS', 1), ('2024-02-01', 3000.0, 'SALARY', 1)",
+]
+
+
+def _schema(engine):
+    """Columns of all tables, and indexes of the tables the queries depend on."""
+    with engine.connect() as conn:
+        tables = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")).scalars().all()
+        columns = {(t, row[1]) for t in tables for row in conn.execute(text(f"PRAGMA table_info({t})"))}
+        indexes = set(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            "AND tbl_name IN ('transactions', 'transaction_labels', 'monthly_rollups')"
+        )).scalars())
+    return columns, indexes
+
+
+def test_legacy_database_is_migrated_once(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    assert migrations.main(["status", "--db", path]) == 1
+    assert migrations.upgrade(engine) == list(range(1, migrations.LATEST_VERSION + 1))
+    assert migrations.upgrade(engine) == []
+    assert migrations.main(["status", "--db", path]) == 0
+
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    Base.metadata.create_all(bind=fresh)
+    assert _schema(engine) == _schema(fresh)
+
+    # The duplicate is kept, without a hash, until removed on request
+    with Session(bind=engine) as db:
+        hashes = db.execute(text("SELECT description, transaction_hash FROM transactions ORDER BY id")).all()
+        assert [(d, h is not None) for d, h in hashes] == [("STARBUCKS", True), ("STARBUCKS", False), ("SALARY", True)]
+        assert rollups.check(db) == []
+
+    assert migrations.main(["remove-duplicates", "--db", path]) == 0
+    with Session(bind=engine) as db:
+        assert db.execute(text("SELECT description FROM transactions ORDER BY id")).scalars().all() == ["STARBUCKS", "SALARY"]
+        assert db.execute(text("SELECT COUNT(*) FROM monthly_rollups")).scalar() == 2
+        assert rollups.check(db) == []
+
+
+def test_new_database_starts_at_latest_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    assert migrations.upgrade(engine) == []
+    with engine.connect() as conn:
+        assert migrations.schema_version(conn) == migrations.LATEST_VERSION
+        assert migrations.pending(conn) == []
+        assert "transactions" in conn.execute(text("SELECT name FROM sqlite_master")).scalars().all()
+
+
+def test_duplicates_are_only_removed_on_request(client, db):
+    account = models.Account(name="Checking", type="Checking")
+    db.add(account)
+    db.flush()
+    db.add_all([models.Transaction(date=date(2024, 1, 5), amount=-20.0, description="STARBUCKS", account_id=account.id)
+                for _ in range(2)])
+    db.commit()
+
+    assert client.post("/migrations/hashes").json()["removed"] == 1
+    assert db.query(models.Transaction).count() == 1
+    assert db.query(models.Transaction).one().transaction_hash is not None
+    assert rollups.check(db) == []
@@ -0,0 +1,87 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func
+
+from app import models, rollups
+from app.categorization import sync_rules
+from app.importer import calculate_hash, import_transactions
+
+
+def _row(account_id, description, amount, d):
+    return {
+        "date": d, "amount": amount, "description": description, "raw_data": {},
+        "account_id": account_id, "transaction_hash": calculate_hash(d, amount, description, account_id),
+    }
+
+
+def _raw_summary(db, start, end):
+    t = models.Transaction
+    rows = db.query(t.category_id, t.amount > 0, func.sum(t.amount)).filter(
+        t.is_transfer == 0, t.amount != 0, t.date >= start, t.date <= end
+    ).group_by(t.category_id, t.amount > 0).all()
+    return {(cat_id, bool(positive)): total for cat_id, positive, total in rows}
+
+
+def test_rollup_follows_every_write_path(client, db):
+    account = models.Account(name="Checking", type="Checking")
+    food = models.Category(name="Food")
+    travel = models.Category(name="Travel")
+    db.add_all([account, food, travel])
+    db.flush()
+    db.add(models.CategorizationRule(pattern="STARBUCKS", priority=0, target_category_id=food.id))
+    db.commit()
+    sync_rules(db)
+
+    rows = [_row(account.id, desc, amount, date(2024, month, day))
+            for month in (1, 2, 3) for day, desc, amount in [(3, "STARBUCKS", -5), (15, "SBB", -40), (28, "SALARY", 3000)]]
+    import_transactions(db, rows)
+    db.commit()
+    assert rollups.check(db) == []
+
+    # ORM insert, PATCH and delete go through the session hook
+    db.add(models.Transaction(date=date(2024, 2, 10), amount=-12.5, description="KIOSK", account_id=account.id))
+    db.commit()
+    sbb = db.query(models.Transaction).filter(models.Transaction.description == "SBB").order_by(models.Transaction.id).all()
+    assert client.patch(f"/transactions/{sbb[0].id}", json={"category_id": travel.id}).status_code == 200
+    assert client.delete(f"/transactions/{sbb[1].id}").status_code == 200
+    assert rollups.check(db) == []
+
+    assert client.request("DELETE", "/transactions/bulk/", json=[sbb[2].id]).status_code == 200
+    assert rollups.check(db) == []
+
+    # Re-categorization writes with a bulk UPDATE
+    assert client.post("/rules/", params={"background": False}, json={"pattern": "SALARY", "target_category_id": food.id}).status_code == 200
+    assert rollups.check(db) == []
+
+    # Partial months at the range edges come from transactions, whole months from the rollup
+    for start, end in [("2024-01-10", "2024-03-05"), ("2024-02-01", "2024-02-29"), ("2024-02-02", "2024-02-20")]:
+        summary = client.get("/analytics/summary", params={"start_date": start, "end_date": end}).json()
+        got = {(c["category_id"], False): -c["total"] for c in summary["spending_categories"]}
+        got.update({(c["category_id"], True): c["total"] for c in summary["income_categories"]})
+        assert got == pytest.approx(_raw_summary(db, start, end))
+
+    monthly = client.get("/analytics/monthly").json()
+    assert monthly == [
+        {"month": "2024-01", "inflow": 3000.0, "outflow": 45.0},
+        {"month": "2024-02", "inflow": 3000.0, "outflow": 17.5},
+        {"month": "2024-03", "inflow": 3000.0, "outflow": 5.0},
+    ]
+
+    # A rollup that drifted is detected and repaired by a rebuild
+    db.query(models.MonthlyRollup).delete()
+    db.commit()
+    assert rollups.check(db)
+    assert client.post("/analytics/rollups/rebuild").json()["mismatches"] > 0
+    assert rollups.check(db) == []
+
+
+def test_split_date_range():
+    assert rollups.split_date_range(None, None) == ((None, None), [])
+    assert rollups.split_date_range("2024-01-01", "2024-03-31") == (("2024-01", "2024-03"), [])
+    assert rollups.split_date_range("2024-01-15", None) == (("2024-02", None), [(date(2024, 1, 15), date(2024, 1, 31))])
+    assert rollups.split_date_range("2024-01-15", "2024-02-10") == (
+        None, [(date(2024, 1, 15), date(2024, 1, 31)), (date(2024, 2, 1), date(2024, 2, 10))]
+    )
+    assert rollups.split_date_range("2024-02-02", "2024-02-20") == (None, [(date(2024, 2, 2), date(2024, 2, 20))])
+    assert rollups.split_date_range("01.02.2024", None) is None
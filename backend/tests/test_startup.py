@@ -0,0 +1,14 @@
+from benchmarks.bench_startup import measure
+
+# Generous enough for a slow CI machine; importing pandas and scikit-learn
+# at startup alone used to take longer than this
+STARTUP_BUDGET_MS = 2000
+
+
+def test_api_starts_without_heavy_dependencies():
+    cumulative, modules = measure("app.main")
+
+    # The ML layer and the CSV parser load these on first use
+    heavy = {"pandas", "numpy", "sklearn", "scipy", "app.utils"}
+    assert heavy & modules == set()
+    assert cumulative["app.main"] / 1000 < STARTUP_BUDGET_MS
@@ -0,0 +1,81 @@
+from datetime import date
+
+from app import models
+
+
+def test_cursor_pagination(client, db):
+    account = models.Account(name="Checking", type="Checking")
+    db.add(account)
+    db.flush()
+    days = [date(2024, 1, 3), date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 2), date(2024, 1, 2)]
+    db.add_all([models.Transaction(date=d, description=f"TX {i}", amount=-i, account_id=account.id) for i, d in enumerate(days)])
+    db.commit()
+
+    offset_ids = [t["id"] for t in client.get("/transactions/", params={"limit": 10}).json()]
+    assert [d.day for d in sorted(days, reverse=True)] == [int(t["date"][-2:]) for t in client.get("/transactions/").json()]
+
+    pages, cursor = [], ""
+    while cursor is not None:
+        page = client.get("/transactions/", params={"limit": 2, "cursor": cursor}).json()
+        pages.append([t["id"] for t in page["items"]])
+        cursor = page["next_cursor"]
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert sum(pages, []) == offset_ids
+
+    # Filters apply on top of the cursor
+    page = client.get("/transactions/", params={"limit": 2, "cursor": "", "start_date": "2024-01-02"}).json()
+    second = client.get("/transactions/", params={"limit": 2, "cursor": page["next_cursor"], "start_date": "2024-01-02"}).json()
+    assert [t["id"] for t in page["items"] + second["items"]] == offset_ids[:4]
+    assert second["next_cursor"] is None
+
+    assert client.get("/transactions/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_cursor_pagination_includes_undated_transactions(client, db):
+    account = models.Account(name="Checking", type="Checking")
+    db.add(account)
+    db.flush()
+    days = [None, date(2024, 1, 2), None, date(2024, 1, 1), date(2024, 1, 2), None, None]
+    db.add_all([models.Transaction(date=d, description=f"TX {i}", amount=-i, account_id=account.id) for i, d in enumerate(days)])
+    db.commit()
+
+    offset = client.get("/transactions/", params={"limit": 10}).json()
+    assert [t["date"] for t in offset] == ["2024-01-02", "2024-01-02", "2024-01-01", None, None, None, None]
+
+    for lean in (False, True):
+        for limit in (1, 2, 3):
+            ids, cursor = [], ""
+            while cursor is not None:
+                page = client.get("/transactions/", params={"limit": limit, "cursor": cursor, "lean": lean}).json()
+                ids += [t["id"] for t in page["items"]]
+                cursor = page["next_cursor"]
+            assert ids == [t["id"] for t in offset]
+
+def test_lean_listing_matches_orm_listing(client, db):
+    account = models.Account(name="Checking", type="Checking")
+    savings = models.Account(name="Savings", type="Savings")
+    food = models.Category(name="Food")
+    coffee, treat = models.Label(name="Coffee"), models.Label(name="Treat", color="#ff0000")
+    db.add_all([account, savings, food, coffee, treat])
+    db.flush()
+    db.add_all([
+        models.Transaction(date=date(2024, 1, 2), description="STARBUCKS", amount=-5, account_id=account.id,
+                           category_id=food.id, raw_data={"Text": "STARBUCKS"}, labels=[coffee, treat]),
+        models.Transaction(date=date(2024, 1, 3), description="TO SAVINGS", amount=-100, account_id=account.id,
+                           is_transfer=1, to_account_id=savings.id, raw_data={"Text": "TO SAVINGS"}),
+        models.Transaction(date=date(2024, 1, 1), description="SALARY", amount=5000, account_id=account.id, is_manual=1),
+    ])
+    db.commit()
+
+    full = client.get("/transactions/").json()
+    lean = client.get("/transactions/", params={"lean": True}).json()
+    for row in full:
+        row["labels"].sort(key=lambda l: l["id"])
+    for row in lean:
+        row["labels"].sort(key=lambda l: l["id"])
+    assert lean == [dict(row, raw_data=None) for row in full]
+    assert client.get("/transactions/", params={"lean": True, "include_raw": True}).json() == full
+
+    page = client.get("/transactions/", params={"lean": True, "limit": 2, "cursor": ""}).json()
+    assert [t["id"] for t in page["items"]] == [t["id"] for t in full[:2]]
+    assert client.get("/transactions/", params={"lean": True, "cursor": page["next_cursor"]}).json()["items"][0]["id"] == full[2]["id"]
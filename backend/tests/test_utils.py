@@ -0,0 +1,103 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+
+from app.importer import calculate_hash
+
+from app.utils import ImportSummary, clean_amount, clean_amount_series, iter_csv_with_profile, parse_csv_with_profile
+
+
+def test_clean_amount_series_matches_clean_amount():
+    values = pd.Series(["1.234,56", "1,234.56", "(12.50)", "1,000,000", "1.000.000", "12,5", "12,50",
+                        "CHF 1'234.50", "-0", "", None, "abc", "--1", "1.2.3,4", "٣٤", 5.0])
+    expected = [clean_amount(v) for v in values]
+    assert clean_amount_series(values).tolist() == expected
+
+    # Columns pandas read as numbers, including values whose str() uses an exponent
+    numbers = pd.Series([1.5, -2.25, 1e20, 1e-6, None, float("inf"), 0.0001, 123456789012345.6])
+    assert clean_amount_series(numbers).tolist() == [clean_amount(v) for v in numbers]
+
+
+def test_parse_csv_with_profile():
+    csv = (
+        "Datum,Betrag,Typ,Text,Ref\n"
+        "02.01.2024,\"1'234.50\",D,COOP ,R1\n"
+        "2024-01-03,\"10,00\",C,MIGROS,\n"
+        ",5,C,NO DATE,R3\n"
+        "not a date,5,C,BAD DATE,R4\n"
+    )
+    profile = {
+        "column_mapping": {"date": "Datum", "amount": "Betrag", "amount_type": "Typ", "description": ["Text", "Ref"]},
+        "date_format": "%d.%m.%Y",
+    }
+    summary = ImportSummary()
+    rows = parse_csv_with_profile(csv.encode(), profile, summary)
+
+    assert [(str(r["date"]), r["amount"], r["description"]) for r in rows] == [
+        ("2024-02-01", -1234.5, "COOP | R1"),
+        ("2024-01-03", 10.0, "MIGROS"),
+    ]
+    assert rows[0]["raw_data"] == {"Datum": "02.01.2024", "Betrag": "1'234.50", "Typ": "D", "Text": "COOP ", "Ref": "R1"}
+    assert rows[0]["account_string"] is None
+
+    report = summary.to_dict()
+    assert (report["rows_total"], report["rows_parsed"], report["rows_failed"]) == (4, 2, 2)
+    assert report["failures"] == {"missing date": 1, "unparseable date": 1}
+
+
+def _baseline_parse(content, profile):
+    """The row-by-row parser parse_csv_with_profile replaced, for the columns used below."""
+    df = pd.read_csv(io.BytesIO(content), encoding="utf-8-sig")
+    mapping = profile["column_mapping"]
+    rows = []
+    for _, row in df.iterrows():
+        if pd.isna(row[mapping["date"]]):
+            continue
+        dt = datetime.strptime(str(row[mapping["date"]]).strip(), profile["date_format"]).date()
+        parts = [str(row[col]).strip() for col in mapping["description"] if not pd.isna(row[col])]
+        rows.append({
+            "date": dt,
+            "amount": clean_amount(row[mapping["amount"]]),
+            "description": " | ".join(parts),
+            "account_string": None if pd.isna(row[mapping["account"]]) else str(row[mapping["account"]]).strip(),
+            "raw_data": row.to_dict(),
+        })
+    return rows
+
+
+def test_parsed_rows_match_baseline_in_both_modes():
+    # Numeric columns, some of which pandas only reads as numbers in some chunks
+    csv = (
+        "Date,Amount,Text,Ref,Account\n"
+        "20240102,-5,007,1,12\n"
+        "20240103,\"1'000.50\",MIGROS,2,12\n"
+        "20240104,12.50,0042,,13\n"
+        "20240105,3,4.10,04,\n"
+        "20240106,3,4.10,5,12\n"
+    )
+    profile = {
+        "column_mapping": {"date": "Date", "amount": "Amount", "description": ["Text", "Ref"], "account": "Account"},
+        "date_format": "%Y%m%d",
+    }
+    baseline = _baseline_parse(csv.encode(), profile)
+    full = parse_csv_with_profile(csv.encode(), profile)
+    streamed = [row for chunk in iter_csv_with_profile(io.BytesIO(csv.encode()), profile, chunksize=2) for row in chunk]
+
+    hashes = lambda rows: [calculate_hash(r["date"], r["amount"], r["description"], 1) for r in rows]
+    assert [r["description"] for r in full] == ["007 | 1.0", "MIGROS | 2.0", "0042", "4.10 | 4.0", "4.10 | 5.0"]
+    assert [r["account_string"] for r in full] == ["12.0", "12.0", "13.0", None, "12.0"]
+    assert full[0]["raw_data"]["Ref"] == 1.0
+    for rows in (full, streamed):
+        assert hashes(rows) == hashes(baseline)
+        for got, expected in zip(rows, baseline):
+            assert {k: v for k, v in got.items() if k != "raw_data"} == {k: v for k, v in expected.items() if k != "raw_data"}
+            assert pd.Series(got["raw_data"]).equals(pd.Series(expected["raw_data"]))
+
+
+def test_raw_data_keeps_any_column_name():
+    csv = 'Date,"Text\'s ""}: name"\n2024-01-02,COOP\n'
+    profile = {"column_mapping": {"date": "Date", "description": "Text's \"}: name"}}
+    rows = parse_csv_with_profile(csv.encode(), profile)
+    assert rows[0]["raw_data"] == {"Date": "2024-01-02", "Text's \"}: name": "COOP"}
+    assert rows[0]["description"] == "COOP"
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import axios from 'axios'
+import { waitForJob } from '../jobs'
 import { X, Tag, PlusCircle, AlertCircle } from 'lucide-react'
 
 function QuickCategorizeModal({ transaction, onClose, onRuleCreated }) {
@@ -89,15 +90,15 @@ function QuickCategorizeModal({ transaction, onClose, onRuleCreated }) {
             }
 
             // 2. Create the rule
-            await axios.post('/api/rules/', {
+            const res = await axios.post('/api/rules/', {
                 pattern: pattern,
                 target_category_id: mode === 'category' ? parseInt(targetCategoryId) : null,
                 target_account_id: mode === 'transfer' ? parseInt(selectedAccountId) : null,
                 target_label_id: mode === 'label' ? parseInt(targetLabelId) : null
             })
 
-            // 3. Trigger re-categorization
-            await axios.post('/api/rules/re-categorize/')
+            // 3. Wait for the re-categorization of the transactions the rule affects
+            await waitForJob(res.data.job_id)
 
             onRuleCreated()
             onClose()
@@ -0,0 +1,12 @@
+import axios from 'axios'
+
+// Rule changes and "Re-categorize all" run in a background job; resolves with the finished
+// job ({ matches, changes, ... }) once it has completed
+export const waitForJob = async (jobId, interval = 500) => {
+    while (true) {
+        const res = await axios.get(`/api/jobs/${jobId}`)
+        if (res.data.status === 'completed') return res.data
+        if (res.data.status === 'failed') throw new Error(res.data.error || 'Re-categorization failed')
+        await new Promise(resolve => setTimeout(resolve, interval))
+    }
+}
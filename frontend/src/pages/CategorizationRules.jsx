@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import axios from 'axios'
+import { waitForJob } from '../jobs'
 import { Plus, Trash2, Tag, Hash, AlertCircle, Search, ChevronRight, PlusCircle, Download, FileUp, Edit3 } from 'lucide-react'
 import EditRuleModal from '../components/EditRuleModal'
 import Notification from '../components/Notification'
@@ -68,9 +69,11 @@ function CategorizationRules({ refreshTrigger }) {
             setNewRulePattern('')
             setAddingRuleTo(null)
             fetchData()
+            const job = await waitForJob(res.data.job_id)
+            fetchData()
             setNotification({
                 type: 'success',
-                message: `Rule created! ${res.data.changes} transactions updated (${res.data.matches} matches found).`
+                message: `Rule created! ${job.changes} transactions updated (${job.matches} matches found).`
             })
         } catch (err) {
             setError('Failed to create matching rule')
@@ -91,7 +94,9 @@ function CategorizationRules({ refreshTrigger }) {
 
     const handleDeleteRule = async (id) => {
         try {
-            await axios.delete(`/api/rules/${id}`)
+            const res = await axios.delete(`/api/rules/${id}`)
+            fetchData()
+            await waitForJob(res.data.job_id)
             fetchData()
         } catch (err) {
             setError('Failed to delete rule')
@@ -101,11 +106,12 @@ function CategorizationRules({ refreshTrigger }) {
     const handleReCategorize = async () => {
         try {
             const res = await axios.post('/api/rules/re-categorize/')
-            let msg = res.data.message
+            const job = await waitForJob(res.data.job_id)
+            let msg = `Re-categorization complete! ${job.changes} transactions were updated, ${job.matches} patterns matched.`
             let type = 'success'
-            if (res.data.failed_rules && res.data.failed_rules.length > 0) {
+            if (job.failed_rules && job.failed_rules.length > 0) {
                 msg += "\n\nWarning: Some rules were skipped due to invalid regex:\n" +
-                    res.data.failed_rules.map(r => `• ${r.pattern}: ${r.error}`).join('\n')
+                    job.failed_rules.map(r => `• ${r.pattern}: ${r.error}`).join('\n')
                 type = 'info'
             }
             setNotification({ type, message: msg })
@@ -541,7 +547,14 @@ function CategorizationRules({ refreshTrigger }) {
                     accounts={accounts}
                     labels={labels}
                     onClose={() => setEditingRule(null)}
-                    onRuleUpdated={(data) => {
+                    onRuleUpdated={async (data) => {
+                        fetchData()
+                        try {
+                            data = await waitForJob(data.job_id)
+                        } catch (err) {
+                            setError('Failed to re-categorize transactions')
+                            return
+                        }
                         fetchData()
                         setNotification({
                             type: 'success',
@@ -33,10 +33,8 @@ function DatabaseSettings() {
         try {
             await axios.post(`/api/databases/select?db_name=${encodeURIComponent(name)}`)
             setReloading(true)
-            // Wait for backend to reload
-            setTimeout(() => {
-                window.location.reload()
-            }, 2000)
+            // The backend switches in-process, only the page state needs a refresh
+            window.location.reload()
         } catch (err) {
             setError('Failed to switch database')
             setLoading(false)
@@ -50,9 +48,7 @@ function DatabaseSettings() {
         try {
             await axios.post(`/api/databases/create?db_name=${newDbName}`)
             setReloading(true)
-            setTimeout(() => {
-                window.location.reload()
-            }, 2000)
+            window.location.reload()
         } catch (err) {
             setError(err.response?.data?.detail || 'Failed to create database')
             setLoading(false)
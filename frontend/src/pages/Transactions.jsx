@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import axios from 'axios'
+import { waitForJob } from '../jobs'
 import { PlusCircle, Search, Tag, Info, AlertCircle, Calendar, ChevronDown, ArrowUp, ArrowDown, ArrowUpDown, Trash2, Zap, User, Settings } from 'lucide-react'
 import { Link } from 'react-router-dom'
 import QuickCategorizeModal from '../components/QuickCategorizeModal'
@@ -86,11 +87,12 @@ function Transactions({ refreshTrigger }) {
     const handleReCategorize = async () => {
         try {
             const res = await axios.post('/api/rules/re-categorize/')
-            let msg = res.data.message
+            const job = await waitForJob(res.data.job_id)
+            let msg = `Re-categorization complete! ${job.changes} transactions were updated, ${job.matches} patterns matched.`
             let type = 'success'
-            if (res.data.failed_rules && res.data.failed_rules.length > 0) {
+            if (job.failed_rules && job.failed_rules.length > 0) {
                 msg += "\n\nWarning: Some rules were skipped due to invalid regex:\n" +
-                    res.data.failed_rules.map(r => `• ${r.pattern}: ${r.error}`).join('\n')
+                    job.failed_rules.map(r => `• ${r.pattern}: ${r.error}`).join('\n')
                 type = 'info'
             }
             setNotification({ type, message: msg })